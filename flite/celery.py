@@ -15,3 +15,6 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+# Queue wait, runtime, retry and failure metrics for every task.
+from flite.core import task_metrics  # noqa
@@ -1,4 +1,5 @@
 import os
+from distutils.util import strtobool
 from .common import Common
 
 
@@ -8,6 +9,7 @@ class Production(Common):
     # Site
     # https://docs.djangoproject.com/en/2.0/ref/settings/#allowed-hosts
     ALLOWED_HOSTS = ["*"]
+    REQUIRE_SHARED_CACHE = strtobool(os.getenv('DJANGO_REQUIRE_SHARED_CACHE', 'yes'))
     INSTALLED_APPS += ("gunicorn", )
 
     # Static files (CSS, JavaScript, Images)
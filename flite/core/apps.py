@@ -1,12 +1,23 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'flite.core'
 
     def ready(self):
-        from .models import Transaction
-        from .tasks import check_budget_threshold_signal
+        from .models import BudgetCategory, Transaction
+        from .signals import (remember_transaction_state_signal, update_category_spent_signal,
+                              release_owner_transactions_signal, invalidate_budget_summary_signal)
+        from .tasks import check_budget_threshold_signal, check_category_threshold_signal
 
-        post_save.connect(check_budget_threshold_signal, sender=Transaction)
\ No newline at end of file
+        pre_save.connect(remember_transaction_state_signal, sender=Transaction)
+        post_save.connect(update_category_spent_signal, sender=Transaction)
+        # Deletes are handled by TransactionQuerySet.delete(): a delete
+        # receiver on Transaction would stop cascades from fast-deleting it.
+        pre_delete.connect(release_owner_transactions_signal, sender=settings.AUTH_USER_MODEL)
+        post_save.connect(check_budget_threshold_signal, sender=Transaction)
+        post_save.connect(check_category_threshold_signal, sender=BudgetCategory)
+        post_save.connect(invalidate_budget_summary_signal, sender=BudgetCategory)
+        post_delete.connect(invalidate_budget_summary_signal, sender=BudgetCategory)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends whose entries are only seen by the process that wrote them.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def require_shared_cache(feature, alias='default'):
+    """
+    Raises ImproperlyConfigured unless the cache is shared by every gunicorn
+    and Celery process, which ``feature`` relies on.
+    """
+    if not is_shared(alias):
+        raise ImproperlyConfigured(
+            f"{feature} needs a cache shared by every web and worker process, but the '{alias}' cache is "
+            f"{settings.CACHES[alias]['BACKEND']}. Set DJANGO_CACHE_URL, e.g. memcache://memcached:11211."
+        )
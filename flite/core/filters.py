@@ -0,0 +1,46 @@
+from datetime import datetime, time, timedelta
+import django_filters
+from django.utils import timezone
+from .models import BudgetCategory, SpendingRollup, Transaction
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _owned_categories(request):
+    if request is None:
+        return BudgetCategory.objects.none()
+    return BudgetCategory.objects.filter(owner=request.user)
+
+
+class TransactionFilter(django_filters.FilterSet):
+    """
+    Date bounds are whole days in the project time zone and are turned into
+    a half-open range on the raw column, so the (owner, date) index still
+    serves the query.
+    """
+    date_from = django_filters.DateFilter(method='filter_date_from')
+    date_to = django_filters.DateFilter(method='filter_date_to')
+    category = django_filters.ModelChoiceFilter(queryset=_owned_categories)
+
+    class Meta:
+        model = Transaction
+        fields = ['category', 'date_from', 'date_to']
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(date__gte=_start_of_day(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(date__lt=_start_of_day(value + timedelta(days=1)))
+
+
+class SpendingRollupFilter(django_filters.FilterSet):
+    period = django_filters.ChoiceFilter(choices=SpendingRollup.PERIODS, required=True)
+    category = django_filters.ModelChoiceFilter(queryset=_owned_categories)
+    date_from = django_filters.DateFilter(field_name='bucket', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='bucket', lookup_expr='lte')
+
+    class Meta:
+        model = SpendingRollup
+        fields = ['period', 'category', 'date_from', 'date_to']
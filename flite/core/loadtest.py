@@ -0,0 +1,177 @@
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+import urllib3
+from flite.users.test.factories import UserFactory
+from .models import BudgetCategory
+from . import perf, spending
+
+USERNAME_PREFIX = 'loadtest-'
+GUNICORN_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               'gunicorn.conf.py')
+
+Account = namedtuple('Account', 'username password token category_ids')
+Scenario = namedtuple('Scenario', 'name weight request')
+
+
+def seed(users, categories, transactions, password):
+    """
+    Creates, or reuses from an earlier run, ``users`` users named
+    loadtest-<n>, each with ``categories`` budget categories and
+    ``transactions`` transactions spread over them.
+    """
+    accounts = []
+    for n in range(users):
+        user = UserFactory(username=f'{USERNAME_PREFIX}{n}', email=f'{USERNAME_PREFIX}{n}@example.com')
+        if not user.check_password(password):
+            user.set_password(password)
+            user.save(update_fields=['password'])
+        owned = list(BudgetCategory.objects.filter(owner=user).order_by('created'))
+        if len(owned) < categories:
+            BudgetCategory.objects.bulk_create([
+                BudgetCategory(owner=user, name=f'Category {index}', description='Load test',
+                               max_spend=Decimal('1000000.00'))
+                for index in range(len(owned), categories)
+            ])
+            owned = list(BudgetCategory.objects.filter(owner=user).order_by('created'))
+        missing = transactions - user.transactions.count()
+        if owned and missing > 0:
+            spending.bulk_create_transactions([
+                {'owner': user, 'category': owned[index % len(owned)], 'amount': Decimal('12.50'),
+                 'description': 'Load test'}
+                for index in range(missing)
+            ])
+        accounts.append(Account(user.username, password, user.auth_token.key, [str(c.pk) for c in owned]))
+    return accounts
+
+
+def _json(method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Token {token}'
+    return method, path, json.dumps(body).encode() if body is not None else None, headers
+
+
+def _signup(account, rng):
+    name = f'{USERNAME_PREFIX}signup-{rng.getrandbits(64):x}'
+    return _json('POST', '/api/v1/users/', {'username': name, 'email': f'{name}@example.com',
+                                            'password': account.password})
+
+
+def _transaction(account, rng):
+    return _json('POST', '/api/v1/transactions/', {
+        'category': rng.choice(account.category_ids), 'amount': '3.75', 'description': 'Load test',
+    }, account.token)
+
+
+# Mostly reads, as in production. Signups are throttled per client IP, so
+# beyond SIGNUP_IP's rate they measure the cost of a 429.
+SCENARIOS = (
+    Scenario('token_auth', 1, lambda account, rng: _json(
+        'POST', '/api-token-auth/', {'username': account.username, 'password': account.password})),
+    Scenario('budget_category_list', 4, lambda account, rng: _json(
+        'GET', '/api/v1/budget_categories/', token=account.token)),
+    Scenario('budget_category_summary', 4, lambda account, rng: _json(
+        'GET', '/api/v1/budget_categories/summary/', token=account.token)),
+    Scenario('budget_category_create', 1, lambda account, rng: _json(
+        'POST', '/api/v1/budget_categories/',
+        {'name': 'Load test', 'description': 'Load test', 'max_spend': '100.00'}, account.token)),
+    Scenario('transaction_list', 6, lambda account, rng: _json(
+        'GET', '/api/v1/transactions/', token=account.token)),
+    Scenario('transaction_create', 3, _transaction),
+    Scenario('signup', 1, _signup),
+)
+
+
+def run(base_url, accounts, scenarios=SCENARIOS, concurrency=8, duration=30, warmup=3, random_seed=0):
+    """
+    Drives the scenarios from ``concurrency`` threads, each picking
+    scenarios by weight for a random account, for ``warmup`` unrecorded
+    seconds and then ``duration`` recorded ones. Returns per-scenario
+    summaries, which also count error and throttled responses.
+    """
+    pool = urllib3.PoolManager(maxsize=concurrency, retries=False, timeout=30)
+    weights = [scenario.weight for scenario in scenarios]
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from, stop_at = started + warmup, started + warmup + duration
+
+    def worker(index):
+        rng = random.Random(random_seed + index)
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                return
+            scenario = rng.choices(scenarios, weights)[0]
+            method, path, body, headers = scenario.request(rng.choice(accounts), rng)
+            begin = time.perf_counter()
+            try:
+                status = pool.request(method, base_url + path, body=body, headers=headers).status
+            except urllib3.exceptions.HTTPError:
+                status = 0
+            elapsed = time.perf_counter() - begin
+            if now < measure_from:
+                continue
+            with lock:
+                statuses[scenario.name][status] += 1
+                if 200 <= status < 400:
+                    latencies[scenario.name].append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {}
+    for scenario in scenarios:
+        counts = statuses[scenario.name]
+        summary = perf.summarize(latencies[scenario.name], duration)
+        summary['throttled'] = counts.get(429, 0)
+        summary['errors'] = sum(count for status, count in counts.items()
+                                if status == 0 or (status >= 400 and status != 429))
+        results[scenario.name] = summary
+    return results
+
+
+def _wait_for_port(host, port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not listen on {host}:{port} within {timeout}s")
+
+
+def start_server(host, port, workers, timeout=30):
+    """
+    Starts gunicorn with the production config on ``host:port`` against the
+    current settings and database, and returns the process once it listens.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'flite.config'))
+    process = subprocess.Popen(
+        # gunicorn 19 has no __main__ module to run with -m.
+        [sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()',
+         '-c', GUNICORN_CONFIG, '--bind', f'{host}:{port}', '--workers', str(workers),
+         '--log-level', 'warning', 'flite.wsgi'],
+        env=env,
+    )
+    try:
+        _wait_for_port(host, port, process, timeout)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from flite.core import loadtest, perf
+
+COMPARED_METRICS = ('rps', 'p50_ms', 'p99_ms')
+
+
+class Command(BaseCommand):
+    help = ("Seeds load-test users and drives the API concurrently, reporting throughput and latency "
+            "percentiles per endpoint; fails when a baseline is given and the run is worse")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help="Server to load, e.g. http://127.0.0.1:8000. "
+                                 "By default gunicorn is started locally")
+        parser.add_argument('--port', type=int, default=8765, help="Port for the locally started server")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="gunicorn workers for the locally started server")
+        parser.add_argument('--users', type=int, default=20, help="Seeded users requests are spread over")
+        parser.add_argument('--categories', type=int, default=5, help="Budget categories per seeded user")
+        parser.add_argument('--transactions', type=int, default=200, help="Transactions per seeded user")
+        parser.add_argument('--password', default='Load-test-1', help="Password of the seeded users")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients")
+        parser.add_argument('--duration', type=int, default=30, help="Seconds of recorded load")
+        parser.add_argument('--warmup', type=int, default=3, help="Seconds of unrecorded load first")
+        parser.add_argument('--output', default=None, help="Write the results as JSON to this file")
+        parser.add_argument('--baseline', default=None,
+                            help="JSON results of an earlier run to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Fraction by which a metric may be worse than the baseline")
+
+    def handle(self, *args, **options):
+        accounts = loadtest.seed(options['users'], options['categories'], options['transactions'],
+                                 options['password'])
+        self.stdout.write(f"Seeded {len(accounts)} users")
+
+        server = None
+        url = options['url']
+        if url is None:
+            try:
+                server = loadtest.start_server('127.0.0.1', options['port'], options['workers'])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            url = f"http://127.0.0.1:{options['port']}"
+        try:
+            results = loadtest.run(url.rstrip('/'), accounts, concurrency=options['concurrency'],
+                                   duration=options['duration'], warmup=options['warmup'])
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        self.report(results)
+        report = {
+            'config': {name: options[name] for name in ('users', 'categories', 'transactions', 'concurrency',
+                                                        'duration', 'workers')},
+            'endpoints': results,
+        }
+        if options['output']:
+            perf.write_json(options['output'], report)
+        if options['baseline']:
+            baseline = perf.read_json(options['baseline'])
+            regressions = perf.compare(results, baseline['endpoints'], COMPARED_METRICS, options['tolerance'])
+            if regressions:
+                raise CommandError("Slower than the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Within tolerance of the baseline"))
+
+    def report(self, results):
+        self.stdout.write(f"{'endpoint':<26}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+                          f"{'errors':>8}{'429s':>7}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<26}{result['requests']:>9}{result['rps']:>9}{self.ms(result['p50_ms']):>9}"
+                f"{self.ms(result['p90_ms']):>9}{self.ms(result['p99_ms']):>9}{result['errors']:>8}"
+                f"{result['throttled']:>7}"
+            )
+
+    def ms(self, value):
+        return '-' if value is None else value
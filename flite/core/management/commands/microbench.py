@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from flite.core import microbench, perf
+
+COMPARED_METRICS = ('median_ms',)
+
+
+class Command(BaseCommand):
+    help = ("Times the hot serializers, signal handlers and helpers; all rows are rolled back. "
+            "Fails when a baseline is given and a benchmark got slower")
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Benchmarks to run, all by default")
+        parser.add_argument('--rounds', type=int, default=5, help="Timed rounds per benchmark")
+        parser.add_argument('--output', default=None, help="Write the results as JSON to this file")
+        parser.add_argument('--baseline', default=None,
+                            help="JSON results of an earlier run to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.15,
+                            help="Fraction by which a median may be slower than the baseline")
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - {benchmark.name for benchmark in microbench.BENCHMARKS}
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        selected = [benchmark for benchmark in microbench.BENCHMARKS
+                    if not options['names'] or benchmark.name in options['names']]
+        results = {}
+        for benchmark in selected:
+            result = results[benchmark.name] = microbench.measure(benchmark, options['rounds'])
+            self.stdout.write(f"{benchmark.name:<32}{result['median_ms']:>12} ms median"
+                              f"{result['min_ms']:>12} ms min{result['ops_per_second']:>12}/s")
+
+        if options['output']:
+            perf.write_json(options['output'], {'benchmarks': results})
+        if options['baseline']:
+            baseline = perf.read_json(options['baseline'])['benchmarks']
+            for name, result in results.items():
+                before = baseline.get(name, {}).get('median_ms')
+                if before:
+                    self.stdout.write(f"{name}: {(result['median_ms'] - before) / before:+.1%} vs baseline")
+            regressions = perf.compare(results, baseline, COMPARED_METRICS, options['tolerance'])
+            if regressions:
+                raise CommandError("Slower than the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Within tolerance of the baseline"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from flite.core import spending
+from flite.core.models import SpendingRollup, Transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily and monthly spending rollups from the transactions table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of rollup rows written per INSERT",
+        )
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help="Only rebuild when there are transactions but no rollups, "
+                 "as on the first deploy of the rollups",
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and (SpendingRollup.objects.exists() or not Transaction.objects.exists()):
+            self.stdout.write("Rollups are already populated")
+            return
+        created = spending.rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} rollup rows"))
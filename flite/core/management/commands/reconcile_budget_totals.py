@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from flite.core import spending
+
+
+class Command(BaseCommand):
+    help = "Rebuilds BudgetCategory.spent from the transactions table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report categories whose stored total has drifted, without fixing them",
+        )
+        parser.add_argument(
+            '--if-needed', action='store_true',
+            help="Only rebuild when some total has drifted, as on the first deploy of the running totals",
+        )
+
+    def handle(self, *args, **options):
+        if options['if_needed'] and not spending.drifted_categories().exists():
+            self.stdout.write("Totals are already up to date")
+            return
+
+        drifted = list(spending.drifted_categories().values('id', 'name', 'spent', 'actual_spent'))
+        for category in drifted:
+            self.stdout.write(
+                f"{category['id']} {category['name']}: "
+                f"stored {category['spent']}, actual {category['actual_spent']}"
+            )
+
+        if options['check']:
+            self.stdout.write(f"{len(drifted)} categories have drifted")
+            return
+
+        updated = spending.rebuild_spent()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} categories"))
@@ -0,0 +1,129 @@
+import statistics
+import time
+import uuid
+from collections import namedtuple
+from decimal import Decimal
+from django.db import transaction
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from flite.users import services
+from flite.users.serializers import CreateUserSerializer
+from .models import BudgetCategory, Transaction
+from .serializers import TransactionSerializer
+from .utils import swagger_decorator
+from . import spending, tasks
+
+# ``setup`` seeds what the benchmark needs and returns the function to
+# time, which is called ``number`` times per round.
+Benchmark = namedtuple('Benchmark', 'name number setup')
+
+
+def _owner(prefix='bench'):
+    name = f'{prefix}-{uuid.uuid4().hex[:8]}'
+    return services.provision_user(username=name, email=f'{name}@example.com')
+
+
+def _category(owner, transactions=0):
+    # Far above what the seeded transactions add up to, so no alert is sent.
+    category = BudgetCategory.objects.create(owner=owner, name='Bench', description='Bench',
+                                             max_spend=Decimal('1000000.00'))
+    spending.bulk_create_transactions([
+        {'owner': owner, 'category': category, 'amount': Decimal('9.99'), 'description': 'Bench'}
+        for _ in range(transactions)
+    ])
+    return category
+
+
+def transaction_serializer_10k():
+    owner = _owner()
+    _category(owner, transactions=10000)
+    rows = list(Transaction.objects.filter(owner=owner))
+    return lambda: TransactionSerializer(rows, many=True).data
+
+
+def check_budget_threshold():
+    owner = _owner()
+    category = _category(owner, transactions=100)
+    instance = Transaction.objects.filter(category=category).first()
+    return lambda: tasks.check_budget_threshold(instance)
+
+
+def referral_code_assignment():
+    # Codes are drawn and checked by the unique index on insert, so what
+    # matters is the cost against a populated table.
+    services.bulk_provision_users(
+        {'username': f'bench-referral-{uuid.uuid4().hex}', 'email': 'bench@example.com'} for _ in range(10000)
+    )
+    profile = _owner().userprofile
+
+    def assign():
+        profile.referral_code = ''
+        profile.save()
+
+    return assign
+
+
+def create_user_serializer_create():
+    serializer = CreateUserSerializer()
+
+    def create():
+        name = f'bench-signup-{uuid.uuid4().hex}'
+        serializer.create({'username': name, 'email': f'{name}@example.com', 'password': 'Bench-password-1'})
+
+    return create
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def _plain_view(request):
+    return Response({})
+
+
+@swagger_decorator(methods=['GET'], responses={200: 'OK'})
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def _swagger_view(request):
+    return Response({})
+
+
+def _dispatch(view):
+    factory = APIRequestFactory()
+    return lambda: view(factory.get('/bench/'))
+
+
+BENCHMARKS = (
+    Benchmark('transaction_serializer_10k', 1, transaction_serializer_10k),
+    Benchmark('check_budget_threshold', 100, check_budget_threshold),
+    Benchmark('referral_code_assignment', 200, referral_code_assignment),
+    Benchmark('create_user_serializer_create', 10, create_user_serializer_create),
+    # The pair shows the cost swagger_decorator adds to every dispatch.
+    Benchmark('api_view_dispatch', 2000, lambda: _dispatch(_plain_view)),
+    Benchmark('swagger_api_view_dispatch', 2000, lambda: _dispatch(_swagger_view)),
+)
+
+
+def measure(benchmark, rounds):
+    """
+    Times ``rounds`` rounds of the benchmark after one untimed round, and
+    returns per-call figures. Everything it writes is rolled back.
+    """
+    with transaction.atomic():
+        run = benchmark.setup()
+        timings = []
+        for round_ in range(rounds + 1):
+            started = time.perf_counter()
+            for _ in range(benchmark.number):
+                run()
+            if round_:
+                timings.append((time.perf_counter() - started) / benchmark.number)
+        transaction.set_rollback(True)
+    median = statistics.median(timings)
+    return {
+        'number': benchmark.number,
+        'rounds': rounds,
+        'median_ms': round(median * 1000, 4),
+        'min_ms': round(min(timings) * 1000, 4),
+        'ops_per_second': round(1 / median, 1) if median else None,
+    }
@@ -1,5 +1,6 @@
 import uuid
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -13,15 +14,70 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
 class BudgetCategory(BaseModel):
+    ALERT_NONE = 'none'
+    ALERT_WARNED = 'warned'
+    ALERT_EXCEEDED = 'exceeded'
+    ALERT_STATES = (
+        (ALERT_NONE, 'No alert sent'),
+        (ALERT_WARNED, 'Threshold warning sent'),
+        (ALERT_EXCEEDED, 'Limit exceeded alert sent'),
+    )
+
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='budget_categories')
     name = models.CharField(max_length=200)
     description = models.TextField()
     max_spend = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    # Running total of the category's transactions, kept in step by flite.core.spending.
+    spent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), editable=False)
+    alert_state = models.CharField(max_length=10, choices=ALERT_STATES, default=ALERT_NONE, editable=False)
     created = models.DateTimeField(default=timezone.now, editable=False)  # Add this line
 
+    # Columns written only through conditional/F-expression UPDATEs; a plain
+    # save() of an already loaded instance must not write back a stale copy.
+    MAINTAINED_FIELDS = ('spent', 'alert_state')
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
+        return super().save(*args, **kwargs)
+
+    @property
+    def remaining(self):
+        return self.max_spend - self.spent
+
+    @property
+    def percent_used(self):
+        if not self.max_spend:
+            return None
+        return (self.spent * 100 / self.max_spend).quantize(Decimal('0.01'))
+
     def __str__(self):
         return self.name
 
+class TransactionQuerySet(models.QuerySet):
+
+    def delete(self):
+        """
+        Releases the rows from the category totals and rollups with grouped
+        queries, then deletes them. Transactions deliberately have no delete
+        receivers, so a cascade from a category or a user fast-deletes them
+        instead of loading each row; see flite.core.signals for the user case.
+        """
+        from . import spending, tasks
+        with transaction.atomic(using=self.db):
+            category_ids = spending.release_transactions(self)
+            deleted = super().delete()
+        for category_id in category_ids:
+            tasks.on_commit_schedule_budget_evaluation(category_id)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Transaction(BaseModel):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions')
     category = models.ForeignKey(BudgetCategory, on_delete=models.CASCADE)
@@ -29,5 +85,71 @@ class Transaction(BaseModel):
     description = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
 
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves transaction_list: the owner's rows walked in (date, id) order.
+            models.Index(fields=['owner', 'date', 'id'], name='core_txn_owner_date_id_idx'),
+            # Lets per-category SUM(amount) be answered from the index alone.
+            models.Index(fields=['category', 'amount'], name='core_txn_category_amount_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_persisted_state()
+        return instance
+
+    # What a transaction contributes to the maintained totals and rollups.
+    SPEND_FIELDS = ('owner_id', 'category_id', 'date', 'amount')
+
+    def current_spend(self):
+        return tuple(getattr(self, field) for field in self.SPEND_FIELDS)
+
+    def remember_persisted_state(self):
+        """
+        Records the spend fields as stored in the database, so that the next
+        save can work out how the category totals move. Left as
+        None when any of them was deferred.
+        """
+        values = tuple(self.__dict__.get(field) for field in self.SPEND_FIELDS)
+        self._persisted_spend = None if None in values else values
+
+    def delete(self, using=None, keep_parents=False):
+        deleted = type(self).objects.using(using or self._state.db).filter(pk=self.pk).delete()
+        self.pk = None
+        return deleted
+
+    def __str__(self):
+        return f"{self.category.name} - {self.amount:.2f}"
+
+class SpendingRollup(BaseModel):
+    """
+    Spending per owner, category and day or month, kept up to date as
+    transactions are written so reports never scan the transactions table.
+    """
+    PERIOD_DAY = 'day'
+    PERIOD_MONTH = 'month'
+    PERIODS = (
+        (PERIOD_DAY, 'Day'),
+        (PERIOD_MONTH, 'Month'),
+    )
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                              related_name='spending_rollups')
+    category = models.ForeignKey(BudgetCategory, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=5, choices=PERIODS)
+    # The day itself, or the first day of the month, in the project time zone.
+    bucket = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'period', 'bucket', 'category'],
+                                    name='core_rollup_unique_bucket'),
+        ]
+
     def __str__(self):
-        return f"{self.category.name} - {self.amount:.2f}"
\ No newline at end of file
+        return f"{self.period} {self.bucket} - {self.total:.2f}"
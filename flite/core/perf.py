@@ -0,0 +1,69 @@
+import json
+import math
+
+# Whether a larger value of each reported metric is better or worse.
+HIGHER_IS_BETTER = {'rps', 'ops_per_second'}
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of ``values``, which must be sorted.
+    """
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """
+    Reduces request latencies in seconds, taken over ``elapsed`` seconds,
+    to the figures kept in reports and baselines.
+    """
+    latencies = sorted(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p90_ms': ms(percentile(latencies, 90)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+def compare(results, baseline, metrics, tolerance):
+    """
+    Compares {name: {metric: value}} results with a baseline of the same
+    shape and returns a line for every metric that got worse by more than
+    ``tolerance``, a fraction. Names missing from either side are skipped.
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in metrics:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{name} {metric}: {before} -> {after} ({change:+.0%} worse)")
+    return regressions
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
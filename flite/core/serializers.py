@@ -1,5 +1,8 @@
+import uuid
+from django.db import transaction
 from rest_framework import serializers
-from .models import BudgetCategory, Transaction
+from .models import BudgetCategory, SpendingRollup, Transaction
+from . import spending, tasks
 
 class BudgetCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,10 +10,68 @@ class BudgetCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'max_spend']
         read_only_fields = ['owner']
 
+class BudgetCategorySummarySerializer(serializers.ModelSerializer):
+    spent = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    remaining = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    percent_used = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = BudgetCategory
+        fields = ['id', 'name', 'max_spend', 'spent', 'remaining', 'percent_used']
+        read_only_fields = fields
+
+class BudgetCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves categories from the batch prefetched by TransactionListSerializer
+    when there is one, instead of running a query per item.
+    """
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched_categories')
+        if prefetched is None:
+            return super().to_internal_value(data)
+        try:
+            return prefetched[uuid.UUID(str(data))]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError, AttributeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+class TransactionListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            category_ids = set()
+            for item in data:
+                try:
+                    category_ids.add(uuid.UUID(str(item['category'])))
+                except (TypeError, ValueError, KeyError, AttributeError):
+                    continue
+            self.context['prefetched_categories'] = BudgetCategory.objects.in_bulk(category_ids)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.context.pop('prefetched_categories', None)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            transactions = spending.bulk_create_transactions(validated_data)
+            # One evaluation per affected category, however many rows it got.
+            for category_id in {instance.category_id for instance in transactions}:
+                tasks.on_commit_schedule_budget_evaluation(category_id)
+        return transactions
+
 class TransactionSerializer(serializers.ModelSerializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    category = BudgetCategoryField(queryset=BudgetCategory.objects.all())
 
     class Meta:
         model = Transaction
         fields = ['id', 'category', 'amount', 'description', 'date']
-        read_only_fields = ['owner']
\ No newline at end of file
+        read_only_fields = ['owner']
+        list_serializer_class = TransactionListSerializer
+
+
+class SpendingRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SpendingRollup
+        fields = ['category', 'period', 'bucket', 'total', 'count']
+        read_only_fields = fields
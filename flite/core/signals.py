@@ -0,0 +1,47 @@
+from .models import Transaction
+from . import spending, tasks
+
+
+def _summary_owner_ids(transaction):
+    owner_ids = [transaction.owner_id]
+    # The category is usually already loaded (the serializer resolved it), and
+    # its owner is the one whose summary shows this amount.
+    if Transaction._meta.get_field('category').is_cached(transaction):
+        owner_ids.append(transaction.category.owner_id)
+    return owner_ids
+
+
+def remember_transaction_state_signal(sender, instance, raw=False, **kwargs):
+    """
+    Makes sure an existing transaction knows its stored spend fields before
+    it is saved. Instances loaded through the ORM already do, so the extra
+    lookup only happens for instances with deferred fields.
+    """
+    if raw or instance._state.adding:
+        return
+    if getattr(instance, '_persisted_spend', None) is not None:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list(*sender.SPEND_FIELDS)
+    instance._persisted_spend = stored.first()
+
+
+def update_category_spent_signal(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_spend = None if created else getattr(instance, '_persisted_spend', None)
+    instance._affected_category_ids = spending.record_transaction_change(old_spend, instance.current_spend())
+    instance.remember_persisted_state()
+    spending.invalidate_budget_summary(*_summary_owner_ids(instance))
+
+
+def release_owner_transactions_signal(sender, instance, **kwargs):
+    # The cascade fast-deletes the user's transactions. Those in the user's
+    # own categories go with their category's totals and rollups; only the
+    # ones in other users' categories have to be released first.
+    transactions = Transaction.objects.filter(owner=instance).exclude(category__owner=instance)
+    for category_id in spending.release_transactions(transactions):
+        tasks.on_commit_schedule_budget_evaluation(category_id)
+
+
+def invalidate_budget_summary_signal(sender, instance, **kwargs):
+    spending.invalidate_budget_summary(instance.owner_id)
@@ -0,0 +1,239 @@
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
+from .models import BudgetCategory, SpendingRollup, Transaction
+
+
+def to_decimal(amount):
+    if amount is None:
+        return Decimal('0')
+    if isinstance(amount, Decimal):
+        return amount
+    return Decimal(str(amount))
+
+
+def adjust_spent(deltas):
+    """
+    Applies a mapping of category id -> amount to BudgetCategory.spent.
+
+    Each category is updated with a single F-expression UPDATE, in id
+    order so that concurrent writers touching the same categories always
+    lock rows in the same sequence.
+    """
+    for category_id in sorted(deltas, key=str):
+        delta = deltas[category_id]
+        if delta:
+            BudgetCategory.objects.filter(pk=category_id).update(spent=F('spent') + delta)
+
+
+def rollup_buckets(date):
+    return day_buckets(timezone.localtime(date).date())
+
+
+def day_buckets(day):
+    return (
+        (SpendingRollup.PERIOD_DAY, day),
+        (SpendingRollup.PERIOD_MONTH, day.replace(day=1)),
+    )
+
+
+def adjust_rollups(deltas):
+    """
+    Applies a mapping of (owner id, category id, period, bucket) -> [amount,
+    count] to the rollup table, creating buckets on first use.
+    """
+    for key in sorted(deltas, key=str):
+        amount, count = deltas[key]
+        if not amount and not count:
+            continue
+        owner_id, category_id, period, bucket = key
+        rollup = SpendingRollup.objects.filter(owner_id=owner_id, category_id=category_id, period=period,
+                                               bucket=bucket)
+        if rollup.update(total=F('total') + amount, count=F('count') + count):
+            continue
+        if count <= 0:
+            # Only removals reach a missing bucket, e.g. while the category
+            # itself is being deleted; there is nothing left to adjust.
+            continue
+        try:
+            with transaction.atomic():
+                SpendingRollup.objects.create(owner_id=owner_id, category_id=category_id, period=period,
+                                              bucket=bucket, total=amount, count=count)
+        except IntegrityError:
+            # A concurrent writer created the bucket first.
+            rollup.update(total=F('total') + amount, count=F('count') + count)
+
+
+class SpendingDeltas:
+    """
+    Accumulates what a set of transaction writes does to the category
+    totals and the rollups, so they can be applied with one UPDATE per row.
+    """
+
+    def __init__(self):
+        self.spent = defaultdict(Decimal)
+        self.rollups = defaultdict(lambda: [Decimal('0'), 0])
+
+    def add(self, spend, sign=1):
+        """
+        ``spend`` is a transaction's (owner id, category id, date, amount);
+        a sign of -1 takes it back out.
+        """
+        owner_id, category_id, date, amount = spend
+        self.add_day(owner_id, category_id, timezone.localtime(date).date(), to_decimal(amount) * sign, sign)
+
+    def add_day(self, owner_id, category_id, day, amount, count):
+        """
+        Adds ``count`` transactions totalling ``amount`` made on ``day``,
+        both negative to take them back out.
+        """
+        self.spent[category_id] += amount
+        for period, bucket in day_buckets(day):
+            entry = self.rollups[(owner_id, category_id, period, bucket)]
+            entry[0] += amount
+            entry[1] += count
+
+    def apply(self):
+        adjust_spent(self.spent)
+        adjust_rollups(self.rollups)
+        return list(self.spent)
+
+
+def record_transaction_change(old_spend, new_spend):
+    """
+    Moves a transaction's contribution from what was stored to what is
+    stored now. Pass None for ``old_spend`` on create and for ``new_spend``
+    on delete. Returns the ids of the categories whose totals were touched.
+    """
+    deltas = SpendingDeltas()
+    if old_spend is not None:
+        deltas.add(old_spend, sign=-1)
+    if new_spend is not None:
+        deltas.add(new_spend)
+    return deltas.apply()
+
+
+def release_transactions(transactions):
+    """
+    Takes a queryset of transactions out of the category totals and rollups
+    ahead of deleting them, with one grouped SELECT and one UPDATE per
+    affected row rather than per transaction. Returns the ids of the
+    categories whose totals were touched.
+    """
+    deltas = SpendingDeltas()
+    owner_ids = set()
+    grouped = (transactions.order_by()
+               .annotate(day=TruncDate('date'))
+               .values('owner_id', 'category_id', 'category__owner_id', 'day')
+               .annotate(total=Sum('amount'), count=Count('id')))
+    for row in grouped:
+        deltas.add_day(row['owner_id'], row['category_id'], row['day'], -row['total'], -row['count'])
+        owner_ids.update((row['owner_id'], row['category__owner_id']))
+    invalidate_budget_summary(*owner_ids)
+    return deltas.apply()
+
+
+def budget_summary_cache_key(owner_id):
+    return f'budget-summary:{owner_id}'
+
+
+def get_budget_summary(owner, build):
+    """
+    Returns the owner's cached budget summary, calling ``build`` to compute
+    and cache it on a miss. Writes that move a category's total call
+    invalidate_budget_summary; the timeout only bounds a lost race between
+    a write and a concurrent rebuild.
+    """
+    key = budget_summary_cache_key(owner.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build()
+        cache.set(key, summary, settings.BUDGET_SUMMARY_CACHE_SECONDS)
+    return summary
+
+
+def invalidate_budget_summary(*owner_ids):
+    # Dropped after commit, so a summary rebuilt in between cannot be cached
+    # from the pre-write totals.
+    keys = [budget_summary_cache_key(owner_id) for owner_id in set(owner_ids)]
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def bulk_create_transactions(items, batch_size=500):
+    """
+    Inserts transactions with multi-row INSERTs and applies their amounts to
+    the category totals and rollups with one UPDATE per affected row rather
+    than per transaction. bulk_create() does not send post_save, so this is
+    the only bookkeeping the new rows get.
+    """
+    transactions = [Transaction(**item) for item in items]
+    deltas = SpendingDeltas()
+    with transaction.atomic():
+        Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+        for instance in transactions:
+            deltas.add(instance.current_spend())
+            instance.remember_persisted_state()
+        deltas.apply()
+        invalidate_budget_summary(*{item['owner'].pk for item in items},
+                                  *{item['category'].owner_id for item in items})
+    return transactions
+
+
+def _true_totals():
+    totals = (Transaction.objects.filter(category=OuterRef('pk'))
+              .order_by()
+              .values('category')
+              .annotate(total=Sum('amount'))
+              .values('total'))
+    return Coalesce(
+        Subquery(totals, output_field=DecimalField(max_digits=14, decimal_places=2)),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def drifted_categories():
+    """
+    Returns the categories whose stored total disagrees with their transactions.
+    """
+    return BudgetCategory.objects.annotate(actual_spent=_true_totals()).filter(~Q(spent=F('actual_spent')))
+
+
+def rebuild_spent():
+    """
+    Recomputes every category's total in one set-based UPDATE.
+    """
+    return BudgetCategory.objects.update(spent=_true_totals())
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Replaces the rollup table with totals recomputed from the transactions,
+    streaming the grouped rows into batched INSERTs.
+    """
+    truncations = (
+        (SpendingRollup.PERIOD_DAY, TruncDate('date')),
+        (SpendingRollup.PERIOD_MONTH, TruncMonth('date', output_field=DateField())),
+    )
+    created = 0
+    with transaction.atomic():
+        SpendingRollup.objects.all().delete()
+        for period, truncation in truncations:
+            grouped = (Transaction.objects.order_by()
+                       .annotate(bucket=truncation)
+                       .values('owner_id', 'category_id', 'bucket')
+                       .annotate(total=Sum('amount'), count=Count('id')))
+            batch = []
+            for row in grouped.iterator(chunk_size=batch_size):
+                batch.append(SpendingRollup(period=period, **row))
+                if len(batch) >= batch_size:
+                    created += len(SpendingRollup.objects.bulk_create(batch))
+                    batch = []
+            created += len(SpendingRollup.objects.bulk_create(batch))
+    return created
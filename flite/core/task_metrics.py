@@ -0,0 +1,114 @@
+import logging
+import os
+import time
+from datetime import datetime
+from celery.signals import (before_task_publish, task_failure, task_postrun, task_prerun, task_retry,
+                            worker_init, worker_process_shutdown)
+from django.conf import settings
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess, start_http_server
+
+logger = logging.getLogger('flite.tasks.slow')
+
+PUBLISHED_AT_HEADER = 'flite_published_at'
+REDACTED = '<redacted>'
+
+TASK_QUEUE_WAIT = Histogram(
+    'flite_celery_task_queue_wait_seconds',
+    'Time from publishing a task, or from its eta, to a worker starting it.',
+    ['task'], buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float('inf')),
+)
+TASK_RUNTIME = Histogram(
+    'flite_celery_task_runtime_seconds', 'Time a worker spent running a task, by final state.',
+    ['task', 'state'], buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float('inf')),
+)
+TASK_RETRIES = Counter('flite_celery_task_retries', 'Task runs that ended in a retry.', ['task'])
+TASK_FAILURES = Counter('flite_celery_task_failures', 'Task runs that raised, by exception.',
+                        ['task', 'exception'])
+
+# Start times of the tasks running in this process, by task id.
+_started = {}
+
+
+def redact(value):
+    """
+    Keeps the shape of task arguments and replaces every value, so the
+    slow-task log never carries emails, phone numbers or amounts.
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if value is None or isinstance(value, bool):
+        return value
+    return REDACTED
+
+
+def queue_wait(request, started):
+    published = getattr(request, PUBLISHED_AT_HEADER, None)
+    if published is None:
+        return None
+    if request.eta:
+        # Time spent waiting for a countdown or eta is not queueing.
+        published = max(published, datetime.fromisoformat(request.eta).timestamp())
+    return max(started - published, 0)
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    # Wall-clock time, as publisher and worker are different processes.
+    headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.perf_counter()
+    wait = queue_wait(task.request, time.time())
+    if wait is not None:
+        TASK_QUEUE_WAIT.labels(task.name).observe(wait)
+
+
+@task_postrun.connect
+def record_task_end(task_id=None, task=None, args=None, kwargs=None, state=None, **extra):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    runtime = time.perf_counter() - started
+    TASK_RUNTIME.labels(task.name, state or 'UNKNOWN').observe(runtime)
+    if runtime >= settings.SLOW_TASK_SECONDS:
+        logger.warning('Slow task %s[%s]: %.3fs, state %s, retries %s, args %r, kwargs %r',
+                       task.name, task_id, runtime, state, task.request.retries, redact(args), redact(kwargs))
+
+
+@task_retry.connect
+def record_task_retry(sender=None, **kwargs):
+    TASK_RETRIES.labels(sender.name).inc()
+
+
+@task_failure.connect
+def record_task_failure(sender=None, exception=None, **kwargs):
+    TASK_FAILURES.labels(sender.name, type(exception).__name__).inc()
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """
+    Serves the worker's metrics on TASK_METRICS_PORT. Pool processes write
+    their samples to PROMETHEUS_MULTIPROC_DIR and the main process merges
+    them, so both must be set for the server to start.
+    """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not settings.TASK_METRICS_PORT or not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        # Samples left by a previous run would otherwise be reported as current.
+        os.remove(os.path.join(path, name))
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(settings.TASK_METRICS_PORT, registry=registry)
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid=None, **kwargs):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -1,7 +1,11 @@
+from functools import partial
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import send_mail
-from django.db.models import Sum
+from django.db import transaction
 from decimal import Decimal
+from .models import BudgetCategory
 
 @shared_task
 def send_threshold_email(user_email, category_name, total_spending, budget, subject):
@@ -13,22 +17,106 @@ def send_threshold_email(user_email, category_name, total_spending, budget, subj
         fail_silently=False,
     )
 
-def check_budget_threshold(instance):
-    from .models import Transaction
 
-    category = instance.category
-    total_spending = Transaction.objects.filter(category=category).aggregate(Sum('amount'))['amount__sum']
+# Severity of each alert state; an alert is only sent when a category moves up.
+ALERT_SEVERITY = {
+    BudgetCategory.ALERT_NONE: 0,
+    BudgetCategory.ALERT_WARNED: 1,
+    BudgetCategory.ALERT_EXCEEDED: 2,
+}
+ALERT_SUBJECTS = {
+    BudgetCategory.ALERT_WARNED: 'Budget threshold warning',
+    BudgetCategory.ALERT_EXCEEDED: 'Budget limit exceeded',
+}
+MAX_TRANSITION_ATTEMPTS = 3
 
-    if total_spending is None:
-        return
+def alert_state_for(total_spending, budget):
+    if not total_spending:
+        return BudgetCategory.ALERT_NONE
+    if total_spending >= budget:
+        return BudgetCategory.ALERT_EXCEEDED
+    if total_spending >= budget * Decimal('0.5'):
+        return BudgetCategory.ALERT_WARNED
+    return BudgetCategory.ALERT_NONE
+
+def evaluate_budget_category(category_id):
+    """
+    Moves a category's alert state to match its current spending and sends
+    an email only when that move crosses a boundary upwards.
+
+    The state change is a compare-and-swap on the stored state, so of two
+    concurrent evaluations only the one whose UPDATE lands sends the email.
+    Returns the new state, or None when nothing changed.
+    """
+    for _ in range(MAX_TRANSITION_ATTEMPTS):
+        # The running total is maintained on the category row, so a fresh read of
+        # that one row replaces aggregating the category's whole history.
+        try:
+            category = BudgetCategory.objects.select_related('owner').get(pk=category_id)
+        except BudgetCategory.DoesNotExist:
+            return None
+
+        total_spending = category.spent
+        budget = Decimal(str(category.max_spend))
+        current_state = category.alert_state
+        new_state = alert_state_for(total_spending, budget)
+        if new_state == current_state:
+            return None
+
+        claimed = BudgetCategory.objects.filter(
+            pk=category_id, alert_state=current_state
+        ).update(alert_state=new_state)
+        if not claimed:
+            # Another evaluation moved the state first; re-read and try again.
+            continue
+
+        if ALERT_SEVERITY[new_state] > ALERT_SEVERITY[current_state]:
+            send_threshold_email.delay(category.owner.email, category.name, str(total_spending), str(budget),
+                                       ALERT_SUBJECTS[new_state])
+        return new_state
+    return None
+
+def _pending_evaluation_key(category_id):
+    return f'budget-evaluation-pending:{category_id}'
 
-    budget = Decimal(str(category.max_spend)) 
-    user_email = instance.owner.email
+@shared_task(ignore_result=True)
+def evaluate_budget_category_task(category_id):
+    # Clear the marker before reading, so a write that lands while this runs
+    # schedules its own evaluation instead of being folded into this one.
+    cache.delete(_pending_evaluation_key(category_id))
+    evaluate_budget_category(category_id)
 
-    if total_spending >= budget * Decimal('0.5') and total_spending < budget:
-        send_threshold_email.delay(user_email, category.name, str(total_spending), str(budget), 'Budget threshold warning')
-    elif total_spending >= budget:
-        send_threshold_email.delay(user_email, category.name, str(total_spending), str(budget), 'Budget limit exceeded')
+def schedule_budget_evaluation(category_id):
+    """
+    Enqueues an evaluation of the category unless one is already pending.
+
+    The first write in a burst publishes a task delayed by the coalescing
+    window; later writes in that window only find the pending marker and
+    return without touching the broker.
+
+    The marker expires when the task is due, so the next write schedules a
+    new evaluation even when the worker's delete cannot reach this process,
+    as with a per-process cache, or the task is lost.
+    """
+    window = settings.BUDGET_EVALUATION_COALESCE_SECONDS
+    if cache.add(_pending_evaluation_key(category_id), True, timeout=window):
+        evaluate_budget_category_task.apply_async((str(category_id),), countdown=window)
+
+def on_commit_schedule_budget_evaluation(category_id):
+    transaction.on_commit(partial(schedule_budget_evaluation, category_id))
+
+def check_budget_threshold(instance):
+    return evaluate_budget_category(instance.category_id)
+
+def check_budget_threshold_signal(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A transaction moved between categories affects both of them.
+    for category_id in getattr(instance, '_affected_category_ids', None) or [instance.category_id]:
+        on_commit_schedule_budget_evaluation(category_id)
 
-def check_budget_threshold_signal(sender, instance, **kwargs):
-    check_budget_threshold(instance)
\ No newline at end of file
+def check_category_threshold_signal(sender, instance, created=False, raw=False, **kwargs):
+    # A changed max_spend can move a category across a boundary without any
+    # transaction being written.
+    if not created and not raw:
+        on_commit_schedule_budget_evaluation(instance.pk)
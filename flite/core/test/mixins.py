@@ -0,0 +1,95 @@
+import os
+import re
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryPlanMixin:
+    """
+    Assertions over the database's plan for a queryset.
+
+    On PostgreSQL sequential scans are disabled for the planner first: it
+    then only picks one when no index can serve the query at all, so the
+    result does not depend on how much data the test seeded.
+    """
+
+    SEQUENTIAL_SCAN_PATTERNS = {
+        'postgresql': r'Seq Scan on {table}\b',
+        'sqlite': r'\bSCAN (TABLE )?{table}\b(?! USING)',
+    }
+
+    def analyze(self, *models):
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def get_query_plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertNoSequentialScan(self, queryset, *models):
+        """
+        Fails if the plan for ``queryset`` reads any of ``models`` (by
+        default the queryset's own model) with a full table scan.
+        """
+        if connection.vendor not in self.SEQUENTIAL_SCAN_PATTERNS:
+            self.skipTest(f'No query plan check for {connection.vendor}')
+        plan = self.get_query_plan(queryset)
+        for model in models or (queryset.model,):
+            table = re.escape(model._meta.db_table)
+            pattern = self.SEQUENTIAL_SCAN_PATTERNS[connection.vendor].format(table=table)
+            self.assertIsNone(
+                re.search(pattern, plan),
+                f'{model._meta.db_table} is read with a sequential scan:\n{plan}',
+            )
+
+
+def record_query_counts(label, sizes, counts):
+    """
+    Appends a line for one endpoint to the file named by QUERY_COUNT_REPORT,
+    if set, so two runs can be diffed.
+    """
+    path = os.environ.get('QUERY_COUNT_REPORT')
+    if not path:
+        return
+    with open(path, 'a') as report:
+        report.write(f"{label}: {', '.join(f'{size}->{count}' for size, count in zip(sizes, counts))}\n")
+
+
+class QueryCountMixin:
+    """
+    Assertions over how many queries an endpoint runs as its data grows.
+    """
+
+    seed_sizes = (1, 5, 20)
+
+    def assertConstantQueries(self, label, seed, request, sizes=None):
+        """
+        Calls ``seed(count)`` to add objects until there are each of
+        ``sizes`` in total, calling ``request()`` at every size, and fails
+        unless the requests all run the same number of queries. One
+        request is made first, so per-process caches are warm, and the
+        on-commit hooks of each seed are run, so cached results are dropped
+        as they would be in production.
+        """
+        sizes = sizes or self.seed_sizes
+        self.assertLess(request().status_code, 400)
+        counts, seeded = [], 0
+        for size in sizes:
+            with self.captureOnCommitCallbacks(execute=True):
+                seed(size - seeded)
+            seeded = size
+            with CaptureQueriesContext(connection) as context:
+                response = request()
+            self.assertLess(response.status_code, 400, f'{label} failed: {getattr(response, "data", "")}')
+            counts.append(len(context))
+        record_query_counts(label, sizes, counts)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        message = (f'{label} ran {counts} queries for {list(sizes)} objects. '
+                   f'Queries at {sizes[-1]}:\n{queries}')
+        self.assertEqual(len(set(counts)), 1, message)
+        return counts[-1]
@@ -0,0 +1,57 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from flite.users.models import User
+from flite.core.models import BudgetCategory
+
+
+class TestPrometheusMiddleware(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        BudgetCategory.objects.create(name='Food', description='Food', max_spend=100, owner=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.user.auth_token.key}'}
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_is_recorded_under_its_view(self):
+        labels = {'view': 'budget_category_list', 'method': 'GET', 'status': '200'}
+        before = self.sample('flite_http_request_duration_seconds_count', **labels)
+        queries_before = self.sample('flite_http_request_db_queries_sum', view='budget_category_list')
+        size_before = self.sample('flite_http_response_size_bytes_sum', view='budget_category_list')
+
+        response = self.client.get(reverse('budget_category_list'), **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sample('flite_http_request_duration_seconds_count', **labels), before + 1)
+        self.assertGreaterEqual(self.sample('flite_http_request_db_queries_sum', view='budget_category_list'),
+                                queries_before + 1)
+        self.assertEqual(self.sample('flite_http_response_size_bytes_sum', view='budget_category_list'),
+                         size_before + len(response.content))
+
+    def test_viewsets_are_labelled_by_class(self):
+        before = self.sample('flite_http_request_db_queries_count', view='UserViewSet')
+        self.client.get(f'/api/v1/users/{self.user.pk}/', **self.auth)
+        self.assertEqual(self.sample('flite_http_request_db_queries_count', view='UserViewSet'), before + 1)
+
+    def test_unknown_urls_share_one_label(self):
+        before = self.sample('flite_http_request_db_queries_count', view='<unresolved>')
+        self.client.get('/no/such/page/')
+        self.client.get('/another/missing/page/')
+        self.assertEqual(self.sample('flite_http_request_db_queries_count', view='<unresolved>'), before + 2)
+
+
+class TestMetricsView(TestCase):
+
+    def test_exposes_request_metrics(self):
+        self.client.get('/no/such/page/')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'flite_http_request_duration_seconds_bucket', response.content)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,82 @@
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from flite.users.models import User
+from flite.core import loadtest, microbench, perf
+from flite.core.models import BudgetCategory, Transaction
+
+
+class TestPerfHelpers(SimpleTestCase):
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(perf.percentile(values, 50), 50)
+        self.assertEqual(perf.percentile(values, 99), 99)
+        self.assertEqual(perf.percentile([7], 99), 7)
+        self.assertIsNone(perf.percentile([], 50))
+
+    def test_summarize_reports_milliseconds_and_throughput(self):
+        summary = perf.summarize([0.010, 0.030, 0.020, 0.100], elapsed=2)
+        self.assertEqual(summary, {'requests': 4, 'rps': 2.0, 'p50_ms': 20.0, 'p90_ms': 100.0,
+                                   'p99_ms': 100.0, 'max_ms': 100.0})
+
+    def test_compare_flags_only_regressions_beyond_tolerance(self):
+        baseline = {'list': {'rps': 100, 'p99_ms': 50}, 'gone': {'rps': 10, 'p99_ms': 5}}
+        results = {
+            'list': {'rps': 70, 'p99_ms': 55},
+            'new': {'rps': 1, 'p99_ms': 500},
+        }
+        self.assertEqual(perf.compare(results, baseline, ('rps', 'p99_ms'), tolerance=0.2),
+                         ['list rps: 100 -> 70 (+30% worse)'])
+
+    def test_compare_treats_faster_runs_as_fine(self):
+        baseline = {'list': {'rps': 100, 'p99_ms': 50}}
+        results = {'list': {'rps': 300, 'p99_ms': 10}}
+        self.assertEqual(perf.compare(results, baseline, ('rps', 'p99_ms'), tolerance=0), [])
+
+
+class TestLoadTestSeeding(TestCase):
+
+    def test_seeding_is_reused_across_runs(self):
+        accounts = loadtest.seed(users=2, categories=3, transactions=10, password='Load-test-1')
+        again = loadtest.seed(users=2, categories=3, transactions=10, password='Load-test-1')
+        self.assertEqual(accounts, again)
+        self.assertEqual(BudgetCategory.objects.count(), 6)
+        self.assertEqual(Transaction.objects.count(), 20)
+        self.assertEqual(len(accounts[0].category_ids), 3)
+
+
+class TestMicrobenchmarks(TestCase):
+
+    def test_measure_reports_per_call_figures_and_rolls_back(self):
+        calls = []
+
+        def setup():
+            owner = User.objects.create_user('benchuser', 'bench@example.com', 'password')
+            BudgetCategory.objects.create(owner=owner, name='Bench', description='Bench', max_spend=1)
+            return lambda: calls.append(1)
+
+        result = microbench.measure(microbench.Benchmark('noop', 3, setup), rounds=2)
+        self.assertEqual(len(calls), 9)
+        self.assertEqual((result['number'], result['rounds']), (3, 2))
+        self.assertLessEqual(result['min_ms'], result['median_ms'])
+        self.assertFalse(BudgetCategory.objects.exists())
+
+    def test_command_compares_with_a_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command('microbench', 'api_view_dispatch', rounds=1, output=path, stdout=StringIO())
+            baseline = perf.read_json(path)
+            self.assertEqual(list(baseline['benchmarks']), ['api_view_dispatch'])
+
+            baseline['benchmarks']['api_view_dispatch']['median_ms'] = 1e-6
+            perf.write_json(path, baseline)
+            with self.assertRaisesRegex(CommandError, 'api_view_dispatch median_ms'):
+                call_command('microbench', 'api_view_dispatch', rounds=1, baseline=path, stdout=StringIO())
+
+    def test_unknown_benchmarks_are_rejected(self):
+        with self.assertRaisesRegex(CommandError, 'Unknown benchmarks: nope'):
+            call_command('microbench', 'nope', stdout=StringIO())
@@ -0,0 +1,67 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from flite.users.models import User
+from flite.core.models import BudgetCategory
+from flite.core import spending
+from .mixins import QueryCountMixin
+
+
+class TestCoreQueryCounts(QueryCountMixin, TestCase):
+    """
+    Core endpoints must run the same number of queries however many rows
+    they return.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('countuser', 'count@example.com', 'password')
+        self.category = BudgetCategory.objects.create(owner=self.user, name='Food', description='Food',
+                                                      max_spend=Decimal('100000.00'))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.auth_token.key}')
+
+    def seed_categories(self, count):
+        BudgetCategory.objects.bulk_create([
+            BudgetCategory(owner=self.user, name=f'Category {n}', description='Seeded',
+                           max_spend=Decimal('100.00'))
+            for n in range(count)
+        ])
+
+    def seed_transactions(self, count):
+        categories = [self.category, *BudgetCategory.objects.bulk_create([
+            BudgetCategory(owner=self.user, name=f'Category {n}', description='Seeded',
+                           max_spend=Decimal('100.00'))
+            for n in range(count)
+        ])]
+        spending.bulk_create_transactions([
+            {'owner': self.user, 'category': categories[n % len(categories)], 'amount': Decimal('1.00'),
+             'description': 'Seeded'}
+            for n in range(count)
+        ])
+
+    def test_budget_category_list(self):
+        self.assertConstantQueries('GET budget_category_list', self.seed_categories,
+                                   lambda: self.client.get(reverse('budget_category_list')))
+
+    def test_budget_category_summary(self):
+        self.assertConstantQueries('GET budget_category_summary', self.seed_transactions,
+                                   lambda: self.client.get(reverse('budget_category_summary')))
+
+    def test_transaction_list(self):
+        self.assertConstantQueries('GET transaction_list', self.seed_transactions,
+                                   lambda: self.client.get(reverse('transaction_list')))
+
+    def test_spending_trends(self):
+        self.assertConstantQueries('GET spending_trends', self.seed_transactions,
+                                   lambda: self.client.get(reverse('spending_trends'), {'period': 'day'}))
+
+    def test_transaction_bulk_create(self):
+        def request():
+            return self.client.post(reverse('transaction_bulk_create'), [
+                {'category': self.category.pk, 'amount': '1.00', 'description': 'Bulk'} for _ in range(5)
+            ], format='json')
+
+        self.assertConstantQueries('POST transaction_bulk_create', self.seed_transactions, request)
@@ -0,0 +1,68 @@
+from decimal import Decimal
+from django.db.models import Sum
+from django.test import TestCase
+from flite.users.models import User
+from flite.core.models import BudgetCategory, SpendingRollup, Transaction
+from flite.core.pagination import TransactionCursorPagination
+from flite.core import spending
+from .mixins import QueryPlanMixin
+
+
+class TestCoreQueryPlans(QueryPlanMixin, TestCase):
+    """
+    The main query behind each core view must be served by an index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'planuser{n}', f'plan{n}@example.com', 'password')
+                     for n in range(5)]
+        categories = [
+            BudgetCategory(owner=user, name=f'Category {n}', description='Seeded',
+                           max_spend=Decimal('1000.00'))
+            for user in cls.users for n in range(10)
+        ]
+        BudgetCategory.objects.bulk_create(categories)
+        spending.bulk_create_transactions([
+            {'owner': category.owner, 'category': category, 'amount': Decimal('1.00'),
+             'description': 'Seeded'}
+            for category in categories for _ in range(20)
+        ])
+        cls.user = cls.users[0]
+        cls.category = categories[0]
+        cls.transaction = Transaction.objects.filter(owner=cls.user).first()
+
+    def setUp(self):
+        self.analyze(User, BudgetCategory, Transaction, SpendingRollup)
+
+    def test_budget_category_list(self):
+        self.assertNoSequentialScan(BudgetCategory.objects.filter(owner=self.user))
+
+    def test_budget_category_detail(self):
+        self.assertNoSequentialScan(BudgetCategory.objects.filter(pk=self.category.pk, owner=self.user))
+
+    def test_transaction_list_first_page(self):
+        queryset = Transaction.objects.filter(owner=self.user).order_by(*TransactionCursorPagination.ordering)
+        self.assertNoSequentialScan(queryset[:100])
+
+    def test_transaction_list_later_page(self):
+        queryset = Transaction.objects.filter(owner=self.user, date__lt=self.transaction.date)
+        self.assertNoSequentialScan(queryset.order_by(*TransactionCursorPagination.ordering)[:100])
+
+    def test_transaction_detail(self):
+        self.assertNoSequentialScan(Transaction.objects.filter(pk=self.transaction.pk, owner=self.user))
+
+    def test_category_total(self):
+        queryset = (Transaction.objects.filter(category=self.category)
+                    .values('category')
+                    .annotate(total=Sum('amount')))
+        self.assertNoSequentialScan(queryset)
+
+    def test_budget_evaluation(self):
+        queryset = BudgetCategory.objects.select_related('owner').filter(pk=self.category.pk)
+        self.assertNoSequentialScan(queryset, BudgetCategory, User)
+
+    def test_spending_trends(self):
+        queryset = SpendingRollup.objects.filter(owner=self.user, period=SpendingRollup.PERIOD_MONTH,
+                                                 bucket__gte=self.transaction.date.date())
+        self.assertNoSequentialScan(queryset.order_by('bucket', 'category_id'))
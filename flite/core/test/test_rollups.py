@@ -0,0 +1,95 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from flite.users.models import User
+from flite.core.models import BudgetCategory, SpendingRollup, Transaction
+from flite.core import spending
+
+
+class TestSpendingRollups(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000.00,
+                                                      owner=self.user)
+        self.other_category = BudgetCategory.objects.create(name='Rent', description='Rent',
+                                                            max_spend=1000.00, owner=self.user)
+        self.today = timezone.localdate()
+
+    def rollups(self, period=SpendingRollup.PERIOD_DAY):
+        return {
+            (rollup.category_id, rollup.bucket): (rollup.total, rollup.count)
+            for rollup in SpendingRollup.objects.filter(owner=self.user, period=period)
+        }
+
+    def snapshot(self):
+        return {
+            (rollup.owner_id, rollup.category_id, rollup.period, rollup.bucket): (rollup.total, rollup.count)
+            for rollup in SpendingRollup.objects.all() if rollup.count
+        }
+
+    def test_create_adds_to_day_and_month_buckets(self):
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('10.00'))
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('2.50'))
+        self.assertEqual(self.rollups(), {(self.category.pk, self.today): (Decimal('12.50'), 2)})
+        self.assertEqual(self.rollups(SpendingRollup.PERIOD_MONTH),
+                         {(self.category.pk, self.today.replace(day=1)): (Decimal('12.50'), 2)})
+
+    def test_update_move_and_delete(self):
+        transaction = Transaction.objects.create(owner=self.user, category=self.category,
+                                                 amount=Decimal('10.00'))
+        transaction.amount = Decimal('4.00')
+        transaction.save()
+        self.assertEqual(self.rollups()[(self.category.pk, self.today)], (Decimal('4.00'), 1))
+
+        transaction.category = self.other_category
+        transaction.save()
+        self.assertEqual(self.rollups()[(self.category.pk, self.today)], (Decimal('0.00'), 0))
+        self.assertEqual(self.rollups()[(self.other_category.pk, self.today)], (Decimal('4.00'), 1))
+
+        transaction.delete()
+        self.assertEqual(self.rollups()[(self.other_category.pk, self.today)], (Decimal('0.00'), 0))
+
+    def test_bulk_create_updates_rollups(self):
+        spending.bulk_create_transactions([
+            {'owner': self.user, 'category': self.category, 'amount': Decimal('1.00'),
+             'description': 'Imported'}
+            for _ in range(3)
+        ])
+        self.assertEqual(self.rollups(), {(self.category.pk, self.today): (Decimal('3.00'), 3)})
+
+    def test_deleting_a_category_removes_its_rollups(self):
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('10.00'))
+        self.category.delete()
+        self.assertFalse(SpendingRollup.objects.filter(category_id=self.category.pk).exists())
+
+    def test_rebuild_matches_incremental_rollups(self):
+        for amount in ('10.00', '5.00', '7.25'):
+            Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal(amount))
+        old = Transaction.objects.create(owner=self.user, category=self.other_category,
+                                         amount=Decimal('3.00'))
+        Transaction.objects.filter(pk=old.pk).update(date=timezone.make_aware(datetime(2024, 1, 31, 23, 30)))
+        SpendingRollup.objects.all().delete()
+
+        call_command('rebuild_spending_rollups', stdout=StringIO())
+        rebuilt = self.snapshot()
+        january = (self.user.pk, self.other_category.pk, SpendingRollup.PERIOD_MONTH, date(2024, 1, 1))
+        self.assertEqual(rebuilt[january], (Decimal('3.00'), 1))
+
+        # Replaying the same rows incrementally gives the same table.
+        SpendingRollup.objects.all().delete()
+        for transaction in Transaction.objects.all():
+            spending.record_transaction_change(None, transaction.current_spend())
+        self.assertEqual(self.snapshot(), rebuilt)
+
+    def test_rebuild_if_empty_only_backfills_an_empty_table(self):
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('10.00'))
+        SpendingRollup.objects.filter(period=SpendingRollup.PERIOD_DAY).update(total=Decimal('1.00'))
+        call_command('rebuild_spending_rollups', '--if-empty', stdout=StringIO())
+        self.assertEqual(self.rollups()[(self.category.pk, self.today)], (Decimal('1.00'), 1))
+
+        SpendingRollup.objects.all().delete()
+        call_command('rebuild_spending_rollups', '--if-empty', stdout=StringIO())
+        self.assertEqual(self.rollups()[(self.category.pk, self.today)], (Decimal('10.00'), 1))
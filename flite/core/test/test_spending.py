@@ -0,0 +1,142 @@
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from flite.users.models import User
+from flite.core.models import BudgetCategory, SpendingRollup, Transaction
+from flite.core import spending
+
+
+class TestCategorySpentTotals(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000.00,
+                                                      owner=self.user)
+        self.other_category = BudgetCategory.objects.create(name='Rent', description='Rent',
+                                                            max_spend=1000.00, owner=self.user)
+
+    def spent(self, category):
+        category.refresh_from_db()
+        return category.spent
+
+    def test_create_adds_to_category_total(self):
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('40.00'),
+                                   description='a')
+        Transaction.objects.create(owner=self.user, category=self.category, amount=10.50, description='b')
+        self.assertEqual(self.spent(self.category), Decimal('50.50'))
+
+    def test_update_applies_the_difference(self):
+        transaction = Transaction.objects.create(owner=self.user, category=self.category,
+                                                 amount=Decimal('40.00'))
+        transaction.amount = Decimal('25.00')
+        transaction.save()
+        self.assertEqual(self.spent(self.category), Decimal('25.00'))
+
+    def test_update_of_a_loaded_instance(self):
+        transaction = Transaction.objects.create(owner=self.user, category=self.category,
+                                                 amount=Decimal('40.00'))
+        loaded = Transaction.objects.get(pk=transaction.pk)
+        loaded.amount = Decimal('60.00')
+        loaded.save()
+        self.assertEqual(self.spent(self.category), Decimal('60.00'))
+
+    def test_update_of_an_instance_with_deferred_amount(self):
+        transaction = Transaction.objects.create(owner=self.user, category=self.category,
+                                                 amount=Decimal('40.00'))
+        loaded = Transaction.objects.defer('amount').get(pk=transaction.pk)
+        loaded.amount = Decimal('15.00')
+        loaded.save()
+        self.assertEqual(self.spent(self.category), Decimal('15.00'))
+
+    def test_moving_between_categories(self):
+        transaction = Transaction.objects.create(owner=self.user, category=self.category,
+                                                 amount=Decimal('40.00'))
+        transaction.category = self.other_category
+        transaction.amount = Decimal('30.00')
+        transaction.save()
+        self.assertEqual(self.spent(self.category), Decimal('0.00'))
+        self.assertEqual(self.spent(self.other_category), Decimal('30.00'))
+
+    def test_delete_releases_the_amount(self):
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('40.00'))
+        transaction = Transaction.objects.create(owner=self.user, category=self.category,
+                                                 amount=Decimal('5.00'))
+        Transaction.objects.get(pk=transaction.pk).delete()
+        self.assertEqual(self.spent(self.category), Decimal('40.00'))
+
+    def test_queryset_delete_releases_the_amount(self):
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('40.00'))
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('5.00'))
+        Transaction.objects.filter(category=self.category).delete()
+        self.assertEqual(self.spent(self.category), Decimal('0.00'))
+
+    def count_category_delete_queries(self, transactions):
+        category = BudgetCategory.objects.create(name='Bulk', description='Bulk', max_spend=1000.00,
+                                                 owner=self.user)
+        spending.bulk_create_transactions([
+            {'owner': self.user, 'category': category, 'amount': Decimal('1.00'), 'description': 'Bulk'}
+            for _ in range(transactions)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            category.delete()
+        self.assertFalse(Transaction.objects.filter(category_id=category.pk).exists())
+        return len(queries)
+
+    def test_category_delete_cascades_without_per_transaction_queries(self):
+        # One DELETE each for the transactions, the rollups and the category.
+        self.assertEqual(self.count_category_delete_queries(100), 3)
+        self.assertEqual(self.count_category_delete_queries(1), 3)
+
+    def test_user_delete_releases_transactions_in_other_users_categories(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        shared = BudgetCategory.objects.create(name='Shared', description='Shared', max_spend=1000.00,
+                                               owner=other)
+        Transaction.objects.create(owner=other, category=shared, amount=Decimal('7.00'))
+        Transaction.objects.create(owner=self.user, category=shared, amount=Decimal('40.00'))
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('5.00'))
+        self.user.delete()
+        self.assertEqual(self.spent(shared), Decimal('7.00'))
+        rollups = SpendingRollup.objects.filter(period=SpendingRollup.PERIOD_DAY)
+        self.assertEqual(list(rollups.values_list('owner_id', 'total')), [(other.pk, Decimal('7.00'))])
+        self.assertFalse(Transaction.objects.filter(owner_id=self.user.pk).exists())
+
+
+class TestReconcileBudgetTotalsCommand(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000.00,
+                                                      owner=self.user)
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('40.00'))
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('2.00'))
+        BudgetCategory.objects.filter(pk=self.category.pk).update(spent=Decimal('999.00'))
+
+    def test_check_reports_without_fixing(self):
+        out = StringIO()
+        call_command('reconcile_budget_totals', '--check', stdout=out)
+        self.assertIn('1 categories have drifted', out.getvalue())
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.spent, Decimal('999.00'))
+
+    def test_rebuilds_totals(self):
+        empty = BudgetCategory.objects.create(name='Empty', description='Empty', max_spend=10.00,
+                                              owner=self.user)
+        BudgetCategory.objects.filter(pk=empty.pk).update(spent=Decimal('3.00'))
+        call_command('reconcile_budget_totals', stdout=StringIO())
+        self.category.refresh_from_db()
+        empty.refresh_from_db()
+        self.assertEqual(self.category.spent, Decimal('42.00'))
+        self.assertEqual(empty.spent, Decimal('0.00'))
+
+    def test_if_needed_rebuilds_drifted_totals(self):
+        call_command('reconcile_budget_totals', '--if-needed', stdout=StringIO())
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.spent, Decimal('42.00'))
+
+    def test_if_needed_skips_consistent_totals(self):
+        call_command('reconcile_budget_totals', stdout=StringIO())
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command('reconcile_budget_totals', '--if-needed', stdout=out)
+        self.assertIn('already up to date', out.getvalue())
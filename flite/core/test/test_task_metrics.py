@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timezone
+from smtplib import SMTPException
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+from flite.core import task_metrics
+from flite.core.tasks import send_threshold_email
+
+TASK = 'flite.core.tasks.send_threshold_email'
+ARGS = ('owner@example.com', 'Food', '120.00', '100.00', 'Budget limit exceeded')
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class TestTaskMetrics(SimpleTestCase):
+
+    def test_runtime_is_recorded_by_task_and_state(self):
+        before = sample('flite_celery_task_runtime_seconds_count', task=TASK, state='SUCCESS')
+        send_threshold_email.apply(args=ARGS)
+        after = sample('flite_celery_task_runtime_seconds_count', task=TASK, state='SUCCESS')
+        self.assertEqual(after, before + 1)
+
+    def test_failures_are_counted_by_exception(self):
+        before = sample('flite_celery_task_failures_total', task=TASK, exception='SMTPException')
+        with mock.patch('flite.core.tasks.send_mail', side_effect=SMTPException):
+            send_threshold_email.apply(args=ARGS)
+        after = sample('flite_celery_task_failures_total', task=TASK, exception='SMTPException')
+        self.assertEqual(after, before + 1)
+        self.assertEqual(task_metrics._started, {})
+
+    def test_retries_are_counted(self):
+        before = sample('flite_celery_task_retries_total', task=TASK)
+        task_metrics.record_task_retry(sender=send_threshold_email)
+        self.assertEqual(sample('flite_celery_task_retries_total', task=TASK), before + 1)
+
+    @override_settings(SLOW_TASK_SECONDS=0)
+    def test_slow_tasks_are_logged_with_arguments_redacted(self):
+        with self.assertLogs('flite.tasks.slow', 'WARNING') as logs:
+            send_threshold_email.apply(args=ARGS, kwargs={})
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(TASK, logs.output[0])
+        for value in ARGS:
+            self.assertNotIn(value, logs.output[0])
+
+    def test_fast_tasks_are_not_logged(self):
+        with mock.patch.object(task_metrics.logger, 'warning') as warning:
+            send_threshold_email.apply(args=ARGS)
+        warning.assert_not_called()
+
+
+class TestQueueWait(SimpleTestCase):
+
+    def request(self, published, eta=None):
+        return SimpleNamespace(**{task_metrics.PUBLISHED_AT_HEADER: published, 'eta': eta})
+
+    def test_publish_stamps_the_headers(self):
+        headers = {}
+        task_metrics.stamp_published_at(headers=headers)
+        self.assertAlmostEqual(headers[task_metrics.PUBLISHED_AT_HEADER], time.time(), delta=1)
+
+    def test_wait_is_measured_from_publishing(self):
+        now = time.time()
+        self.assertAlmostEqual(task_metrics.queue_wait(self.request(now - 3), now), 3)
+
+    def test_wait_is_measured_from_the_eta(self):
+        now = time.time()
+        eta = datetime.fromtimestamp(now - 1, timezone.utc).isoformat()
+        self.assertAlmostEqual(task_metrics.queue_wait(self.request(now - 60, eta), now), 1, places=3)
+
+    def test_unstamped_requests_are_skipped(self):
+        self.assertIsNone(task_metrics.queue_wait(SimpleNamespace(eta=None), time.time()))
+
+    def test_redact_keeps_only_the_shape(self):
+        self.assertEqual(task_metrics.redact([{'email': 'a@b.com', 'ids': (1, 2)}, None, True]),
+                         [{'email': '<redacted>', 'ids': ['<redacted>', '<redacted>']}, None, True])
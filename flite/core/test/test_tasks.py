@@ -1,10 +1,14 @@
 
 
+import time
+from unittest import mock
 from django.test import TestCase
 from django.core import mail
+from django.core.cache import cache
 from flite.users.models import User
 from flite.core.models import BudgetCategory, Transaction
-from flite.core.tasks import check_budget_threshold
+from flite.core import tasks
+from flite.core.tasks import check_budget_threshold, evaluate_budget_category
 from decimal import Decimal
 
 class TestCheckBudgetThresholdTask(TestCase):
@@ -31,4 +35,123 @@ class TestCheckBudgetThresholdTask(TestCase):
         Transaction.objects.create(owner=self.user, category=self.category, amount=20.00, description='Test transaction')
         transaction = Transaction.objects.create(owner=self.user, category=self.category, amount=10.00, description='Test transaction')
         check_budget_threshold(transaction)
-        self.assertEqual(len(mail.outbox), 0) 
\ No newline at end of file
+        self.assertEqual(len(mail.outbox), 0) 
+
+class TestBudgetAlertStateMachine(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Test Category', description='Test description',
+                                                      max_spend=100.00, owner=self.user)
+
+        # Run scheduled evaluations in-process and record alerts instead of
+        # publishing either to the broker.
+        self.subjects = []
+        evaluate = tasks.evaluate_budget_category_task
+        patches = [
+            mock.patch.object(evaluate, 'apply_async',
+                              side_effect=lambda args, **kwargs: evaluate.apply(args)),
+            mock.patch.object(tasks.send_threshold_email, 'delay',
+                              side_effect=lambda *args: self.subjects.append(args[-1])),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def add(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(owner=self.user, category=self.category,
+                                              amount=Decimal(amount), description='Test transaction')
+
+    def alert_state(self):
+        self.category.refresh_from_db()
+        return self.category.alert_state
+
+    def test_warning_is_sent_once_per_crossing(self):
+        self.add('50.00')
+        self.add('10.00')
+        self.add('10.00')
+        self.assertEqual(self.subjects, ['Budget threshold warning'])
+        self.assertEqual(self.alert_state(), BudgetCategory.ALERT_WARNED)
+
+    def test_exceeded_is_sent_once_after_warning(self):
+        self.add('60.00')
+        self.add('50.00')
+        self.add('5.00')
+        self.assertEqual(self.subjects,
+                         ['Budget threshold warning', 'Budget limit exceeded'])
+        self.assertEqual(self.alert_state(), BudgetCategory.ALERT_EXCEEDED)
+
+    def test_jumping_straight_past_the_limit_sends_only_exceeded(self):
+        self.add('150.00')
+        self.assertEqual(self.subjects, ['Budget limit exceeded'])
+
+    def test_deleting_resets_the_state_and_allows_a_new_alert(self):
+        transaction = self.add('60.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.delete()
+        self.assertEqual(self.alert_state(), BudgetCategory.ALERT_NONE)
+        self.add('70.00')
+        self.assertEqual(len(self.subjects), 2)
+
+    def test_editing_downward_resets_the_state_without_an_email(self):
+        transaction = self.add('120.00')
+        transaction.amount = Decimal('60.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.save()
+        self.assertEqual(self.alert_state(), BudgetCategory.ALERT_WARNED)
+        self.assertEqual(len(self.subjects), 1)
+
+    def test_moving_a_transaction_resets_the_old_category(self):
+        transaction = self.add('60.00')
+        other = BudgetCategory.objects.create(name='Other', description='Other', max_spend=1000.00,
+                                              owner=self.user)
+        transaction.category = other
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.save()
+        self.assertEqual(self.alert_state(), BudgetCategory.ALERT_NONE)
+
+    def test_lowering_max_spend_can_cross_a_boundary(self):
+        self.add('40.00')
+        self.category.max_spend = Decimal('40.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self.subjects, ['Budget limit exceeded'])
+
+    def test_stale_evaluation_does_not_send_twice(self):
+        self.add('60.00')
+        # A second evaluator that read the old state loses the compare-and-swap.
+        claimed = BudgetCategory.objects.filter(
+            pk=self.category.pk, alert_state=BudgetCategory.ALERT_NONE
+        ).update(alert_state=BudgetCategory.ALERT_WARNED)
+        self.assertEqual(claimed, 0)
+        self.assertIsNone(evaluate_budget_category(self.category.pk))
+        self.assertEqual(len(self.subjects), 1)
+
+    def test_evaluation_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('60.00'))
+            self.assertEqual(self.subjects, [])
+        self.assertEqual(self.subjects, ['Budget threshold warning'])
+
+    def test_burst_of_saves_is_coalesced_into_one_evaluation(self):
+        with mock.patch.object(tasks.evaluate_budget_category_task, 'apply_async') as apply_async:
+            for _ in range(5):
+                self.add('1.00')
+        apply_async.assert_called_once_with((str(self.category.pk),), countdown=5)
+
+    def test_a_write_after_the_evaluation_started_schedules_another(self):
+        with mock.patch.object(tasks.evaluate_budget_category_task, 'apply_async') as apply_async:
+            self.add('1.00')
+            tasks.evaluate_budget_category_task.apply((str(self.category.pk),))
+            self.add('1.00')
+        self.assertEqual(apply_async.call_count, 2)
+
+    def test_marker_expires_when_the_evaluation_is_due(self):
+        # The worker's delete never reaches this process's cache here.
+        with mock.patch.object(tasks.evaluate_budget_category_task, 'apply_async') as apply_async:
+            self.add('1.00')
+            later = time.time() + 6
+            with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+                self.add('1.00')
+        self.assertEqual(apply_async.call_count, 2)
@@ -18,4 +18,16 @@ class TestUrls(SimpleTestCase):
 
     def test_transaction_detail_url(self):
         path = reverse('transaction_detail', kwargs={'pk': 1})
-        self.assertEqual(resolve(path).func, views.transaction_detail)
\ No newline at end of file
+        self.assertEqual(resolve(path).func, views.transaction_detail)
+
+    def test_transaction_bulk_create_url(self):
+        path = reverse('transaction_bulk_create')
+        self.assertEqual(resolve(path).func, views.transaction_bulk_create)
+
+    def test_budget_category_summary_url(self):
+        path = reverse('budget_category_summary')
+        self.assertEqual(resolve(path).func, views.budget_category_summary)
+
+    def test_spending_trends_url(self):
+        path = reverse('spending_trends')
+        self.assertEqual(resolve(path).func, views.spending_trends)
@@ -1,8 +1,17 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 from flite.users.models import User
-from flite.core.views import budget_category_list, budget_category_detail, transaction_list, transaction_detail
+from flite.core import tasks
+from flite.core.views import (budget_category_list, budget_category_detail, transaction_list, transaction_detail,
+                              transaction_bulk_create, budget_category_summary, spending_trends)
 from flite.core.models import BudgetCategory, Transaction
 
 class TestBudgetCategoryViews(TestCase):
@@ -61,7 +70,7 @@ class TestTransactionViews(TestCase):
         force_authenticate(request, user=self.user)
         response = transaction_list(request)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_transaction_list_post(self):
         data = {'owner': self.user.pk, 'category': self.category.pk, 'amount': 20.00, 'description': 'New transaction'}
@@ -141,4 +150,223 @@ class TestTransactionViews(TestCase):
         request = self.factory.get('/budget-categories/{}/'.format(invalid_id), format='json')
         force_authenticate(request, user=self.user)
         response = budget_category_detail(request, pk=invalid_id)
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class TestTransactionBulkCreateView(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000.00,
+                                                      owner=self.user)
+        self.other_category = BudgetCategory.objects.create(name='Rent', description='Rent',
+                                                            max_spend=1000.00, owner=self.user)
+
+    def post(self, data):
+        request = self.factory.post('/transactions/bulk/', data, format='json')
+        force_authenticate(request, user=self.user)
+        return transaction_bulk_create(request)
+
+    def item(self, category, amount):
+        return {'category': str(category.pk), 'amount': amount, 'description': 'Imported'}
+
+    def test_bulk_create_inserts_all_rows_and_updates_totals(self):
+        data = [self.item(self.category, '10.00') for _ in range(5)]
+        data.append(self.item(self.other_category, '2.50'))
+        with mock.patch.object(tasks, 'schedule_budget_evaluation') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.post(data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(Transaction.objects.filter(owner=self.user).count(), 6)
+        self.category.refresh_from_db()
+        self.other_category.refresh_from_db()
+        self.assertEqual(self.category.spent, Decimal('50.00'))
+        self.assertEqual(self.other_category.spent, Decimal('2.50'))
+        # One evaluation per affected category rather than one per row.
+        self.assertEqual(sorted(str(call.args[0]) for call in schedule.call_args_list),
+                         sorted([str(self.category.pk), str(self.other_category.pk)]))
+
+    def test_bulk_create_query_count_does_not_grow_with_the_batch(self):
+        # The first batch also creates today's rollup buckets.
+        self.post([self.item(self.category, '1.00')])
+        query_counts = []
+        for size in (2, 50):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post([self.item(self.category, '1.00') for _ in range(size)])
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_bulk_create_reports_per_item_errors_and_inserts_nothing(self):
+        data = [
+            self.item(self.category, '10.00'),
+            self.item(self.category, 'invalid'),
+            {'category': '00000000-0000-0000-0000-000000000000', 'amount': '1.00', 'description': 'x'},
+        ]
+        response = self.post(data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('amount', response.data[1])
+        self.assertIn('category', response.data[2])
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_bulk_create_rejects_a_non_list_payload(self):
+        response = self.post(self.item(self.category, '10.00'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TRANSACTION_BULK_MAX_ITEMS=2)
+    def test_bulk_create_rejects_oversized_batches(self):
+        response = self.post([self.item(self.category, '1.00') for _ in range(3)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+
+class TestTransactionListPagination(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000.00,
+                                                      owner=self.user)
+        self.other_category = BudgetCategory.objects.create(name='Rent', description='Rent',
+                                                            max_spend=1000.00, owner=self.user)
+        self.start = timezone.make_aware(datetime(2024, 5, 1, 12, 0))
+        self.transactions = []
+        for day in range(10):
+            category = self.category if day % 2 else self.other_category
+            transaction = Transaction.objects.create(owner=self.user, category=category, amount=1.00,
+                                                     description=str(day))
+            Transaction.objects.filter(pk=transaction.pk).update(date=self.start + timedelta(days=day))
+            self.transactions.append(transaction)
+        # Two rows sharing a timestamp must still be split cleanly across pages.
+        Transaction.objects.filter(pk=self.transactions[5].pk).update(date=self.start + timedelta(days=4))
+
+    def get(self, url):
+        request = self.factory.get(url, format='json')
+        force_authenticate(request, user=self.user)
+        return transaction_list(request)
+
+    def test_pages_cover_every_row_exactly_once(self):
+        seen = []
+        url = '/transactions/?page_size=3'
+        while url:
+            response = self.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(set(seen), {str(transaction.pk) for transaction in self.transactions})
+
+    def test_results_are_newest_first(self):
+        response = self.get('/transactions/?page_size=2')
+        self.assertEqual(response.data['results'][0]['description'], '9')
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.get('/transactions/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_date_range_filter_is_inclusive_of_whole_days(self):
+        response = self.get('/transactions/?date_from=2024-05-03&date_to=2024-05-05')
+        descriptions = sorted(item['description'] for item in response.data['results'])
+        self.assertEqual(descriptions, ['2', '3', '4', '5'])
+
+    def test_category_filter(self):
+        response = self.get(f'/transactions/?category={self.category.pk}')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_category_filter_rejects_another_users_category(self):
+        other_user = User.objects.create_user('otheruser', 'other@example.com', 'password')
+        foreign = BudgetCategory.objects.create(name='Other', description='Other', max_spend=10.00,
+                                                owner=other_user)
+        response = self.get(f'/transactions/?category={foreign.pk}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestBudgetCategorySummaryView(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=200.00,
+                                                      owner=self.user)
+        self.empty = BudgetCategory.objects.create(name='Zero', description='Zero', max_spend=0.00,
+                                                   owner=self.user)
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('50.00'))
+        # Writes schedule a threshold evaluation on commit; keep it off the broker.
+        patcher = mock.patch.object(tasks.evaluate_budget_category_task, 'apply_async')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self):
+        request = self.factory.get('/budget_categories/summary/', format='json')
+        force_authenticate(request, user=self.user)
+        return budget_category_summary(request)
+
+    def test_summary_reports_spent_remaining_and_percent(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = {item['name']: item for item in response.data}
+        self.assertEqual(summary['Food']['spent'], '50.00')
+        self.assertEqual(summary['Food']['remaining'], '150.00')
+        self.assertEqual(summary['Food']['percent_used'], '25.00')
+        self.assertIsNone(summary['Zero']['percent_used'])
+
+    def test_summary_is_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+    def test_transaction_write_invalidates_the_summary(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('30.00'))
+        response = self.get()
+        summary = {item['name']: item for item in response.data}
+        self.assertEqual(summary['Food']['spent'], '80.00')
+
+    def test_category_write_invalidates_the_summary(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empty.delete()
+        self.assertEqual(len(self.get().data), 1)
+
+
+class TestSpendingTrendsView(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user('testuser', 'test@example.com', 'password')
+        self.category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000.00,
+                                                      owner=self.user)
+        self.other_category = BudgetCategory.objects.create(name='Rent', description='Rent',
+                                                            max_spend=1000.00, owner=self.user)
+        Transaction.objects.create(owner=self.user, category=self.category, amount=Decimal('10.00'))
+        Transaction.objects.create(owner=self.user, category=self.other_category, amount=Decimal('4.00'))
+        other_user = User.objects.create_user('otheruser', 'other@example.com', 'password')
+        Transaction.objects.create(owner=other_user, category=self.category, amount=Decimal('99.00'))
+
+    def get(self, url):
+        request = self.factory.get(url, format='json')
+        force_authenticate(request, user=self.user)
+        return spending_trends(request)
+
+    def test_monthly_trend_reads_the_rollups(self):
+        with self.assertNumQueries(1):
+            response = self.get('/spending_trends/?period=month')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(item['total'] for item in response.data), ['10.00', '4.00'])
+        self.assertEqual(response.data[0]['bucket'], str(timezone.localdate().replace(day=1)))
+
+    def test_daily_trend_for_one_category(self):
+        response = self.get(f'/spending_trends/?period=day&category={self.category.pk}')
+        self.assertEqual([(item['total'], item['count']) for item in response.data], [('10.00', 1)])
+
+    def test_date_range_excludes_other_buckets(self):
+        response = self.get('/spending_trends/?period=day&date_to=2000-01-01')
+        self.assertEqual(response.data, [])
+
+    def test_period_is_required(self):
+        response = self.get('/spending_trends/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,7 +3,10 @@ from . import views
 
 urlpatterns = [
     path('budget_categories/', views.budget_category_list, name='budget_category_list'),
+    path('budget_categories/summary/', views.budget_category_summary, name='budget_category_summary'),
     path('budget_categories/<int:pk>/', views.budget_category_detail, name='budget_category_detail'),
     path('transactions/', views.transaction_list, name='transaction_list'),
+    path('transactions/bulk/', views.transaction_bulk_create, name='transaction_bulk_create'),
     path('transactions/<int:pk>/', views.transaction_detail, name='transaction_detail'),
+    path('spending_trends/', views.spending_trends, name='spending_trends'),
 ]
\ No newline at end of file
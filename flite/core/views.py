@@ -1,11 +1,16 @@
 import logging
+from django.conf import settings
 from rest_framework.decorators import api_view, permission_classes,authentication_classes
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
-from .models import BudgetCategory, Transaction
-from .serializers import BudgetCategorySerializer, TransactionSerializer
+from flite.users.authentication import CachedTokenAuthentication
+from .filters import SpendingRollupFilter, TransactionFilter
+from .models import BudgetCategory, SpendingRollup, Transaction
+from .pagination import TransactionCursorPagination
+from . import spending
+from .serializers import (BudgetCategorySerializer, BudgetCategorySummarySerializer, SpendingRollupSerializer,
+                          TransactionSerializer)
 from rest_framework.permissions import AllowAny
 from .utils import swagger_decorator
 
@@ -17,7 +22,7 @@ logger.addHandler(logging.StreamHandler())
 @swagger_decorator(methods=['GET'], responses={200: BudgetCategorySerializer(many=True)})
 @swagger_decorator(methods=['POST'], request_body=BudgetCategorySerializer, responses={201: BudgetCategorySerializer()})
 @api_view(['GET', 'POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def budget_category_list(request):
     if request.method == 'GET':
@@ -31,11 +36,22 @@ def budget_category_list(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@swagger_decorator(methods=['GET'], responses={200: BudgetCategorySummarySerializer(many=True)})
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def budget_category_summary(request):
+    def build():
+        categories = BudgetCategory.objects.filter(owner=request.user)
+        return BudgetCategorySummarySerializer(categories, many=True).data
+
+    return Response(spending.get_budget_summary(request.user, build))
+
 @swagger_decorator(methods=['GET'], responses={200: BudgetCategorySerializer()})
 @swagger_decorator(methods=['PUT'], request_body=BudgetCategorySerializer, responses={200: BudgetCategorySerializer()})
 @swagger_decorator(methods=['DELETE'], responses={204: 'No Content'})
 @api_view(['GET', 'PUT', 'DELETE'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def budget_category_detail(request, pk):
     try:
@@ -58,13 +74,18 @@ def budget_category_detail(request, pk):
 @swagger_decorator(methods=['GET'], responses={200: TransactionSerializer(many=True)})
 @swagger_decorator(methods=['POST'], request_body=TransactionSerializer, responses={201: TransactionSerializer()})
 @api_view(['GET', 'POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def transaction_list(request):
     if request.method == 'GET':
         transactions = Transaction.objects.filter(owner=request.user)
-        serializer = TransactionSerializer(transactions, many=True)
-        return Response(serializer.data)
+        filterset = TransactionFilter(request.query_params, queryset=transactions, request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=400)
+        paginator = TransactionCursorPagination()
+        page = paginator.paginate_queryset(filterset.qs, request)
+        serializer = TransactionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     elif request.method == 'POST':
         serializer = TransactionSerializer(data=request.data)
         if serializer.is_valid():
@@ -72,11 +93,28 @@ def transaction_list(request):
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
 
+@swagger_decorator(methods=['POST'], request_body=TransactionSerializer(many=True),
+                   responses={201: TransactionSerializer(many=True)})
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def transaction_bulk_create(request):
+    max_items = settings.TRANSACTION_BULK_MAX_ITEMS
+    if isinstance(request.data, list) and len(request.data) > max_items:
+        return Response({'non_field_errors': [f'A batch can hold at most {max_items} transactions.']},
+                        status=400)
+    serializer = TransactionSerializer(data=request.data, many=True)
+    if serializer.is_valid():
+        serializer.save(owner=request.user)
+        return Response(serializer.data, status=201)
+    # Errors are listed in request order, with an empty object for each valid item.
+    return Response(serializer.errors, status=400)
+
 @swagger_decorator(methods=['GET'], responses={200: TransactionSerializer()})
 @swagger_decorator(methods=['PUT'], request_body=TransactionSerializer, responses={200: TransactionSerializer()})
 @swagger_decorator(methods=['DELETE'], responses={204: 'No Content'})
 @api_view(['GET', 'PUT', 'DELETE'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def transaction_detail(request, pk):
     try:
@@ -96,4 +134,16 @@ def transaction_detail(request, pk):
             return Response(serializer.errors, status=400)
     elif request.method == 'DELETE':
         transaction.delete()
-        return Response(status=204)
\ No newline at end of file
+        return Response(status=204)
+
+@swagger_decorator(methods=['GET'], responses={200: SpendingRollupSerializer(many=True)})
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def spending_trends(request):
+    rollups = SpendingRollup.objects.filter(owner=request.user).order_by('bucket', 'category_id')
+    filterset = SpendingRollupFilter(request.query_params, queryset=rollups, request=request)
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=400)
+    serializer = SpendingRollupSerializer(filterset.qs, many=True)
+    return Response(serializer.data)
@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.views.generic.base import RedirectView
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken import views
+from .core.metrics import metrics_view
 from .users.views import UserViewSet, UserCreateViewSet, SendNewPhonenumberVerifyViewSet
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
@@ -32,6 +33,7 @@ urlpatterns = [
         path('', include('flite.core.urls')),  # Include URLs from your app
     ])),
     path('api-token-auth/', views.obtain_auth_token),
+    path('metrics', metrics_view, name='metrics'),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     path(
         "api/playground/",
@@ -5,4 +5,7 @@ from .models import User
 
 @admin.register(User)
 class UserAdmin(UserAdmin):
-    pass
+    list_display = UserAdmin.list_display + ('total_amount',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_total_amount()
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = 'flite.users'
+
+    def ready(self):
+        from . import sms, throttling
+        # Fail at startup rather than silently losing messages or
+        # multiplying rate limits by the number of workers.
+        sms.check_configuration()
+        throttling.check_configuration()
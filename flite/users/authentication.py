@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_key(key):
+    return f'auth-token:{key}'
+
+
+def invalidate_cached_tokens(*keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers the token -> user lookup for
+    TOKEN_AUTH_CACHE_SECONDS, so most requests skip the Token/User query.
+    Entries are dropped when the token is deleted or its user is saved.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            # Unknown keys and inactive users raise here and are never cached.
+            credentials = super().authenticate_credentials(key)
+            cache.set(cache_key, credentials, settings.TOKEN_AUTH_CACHE_SECONDS)
+        return credentials
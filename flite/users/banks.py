@@ -0,0 +1,118 @@
+import threading
+import time
+import uuid
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from flite.core.cache import is_shared
+
+VERSION_KEY = 'all-banks:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'checked': None, 'loaded': None, 'by_id': {}, 'by_code': {}}
+
+
+def bump_version():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_banks():
+    """
+    Makes every process reload the bank list once the current transaction
+    commits. Called when an AllBanks row is saved or deleted; writes that
+    skip signals, such as QuerySet.update(), must call it themselves.
+    """
+    transaction.on_commit(bump_version)
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First use, or evicted: start a new version so every process reloads.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _load(version, now):
+    AllBanks = apps.get_model('users', 'AllBanks')
+    by_id, by_code = {}, {}
+    for bank in AllBanks.objects.order_by('name', 'pk'):
+        by_id[str(bank.pk)] = bank
+        by_code.setdefault(bank.bank_code, bank)
+    _state.update(version=version, loaded=now, by_id=by_id, by_code=by_code)
+
+
+def _is_due(now):
+    checked = _state['checked']
+    return checked is None or now - checked >= settings.ALL_BANKS_VERSION_CHECK_SECONDS
+
+
+def _is_expired(now):
+    # A process-local cache never sees other processes' version bumps, so
+    # the list is only trusted for a bounded time.
+    if _state['loaded'] is None:
+        return True
+    return not is_shared() and now - _state['loaded'] >= settings.ALL_BANKS_LOCAL_RELOAD_SECONDS
+
+
+def _banks():
+    """
+    Returns this process's bank list, reloading it when the shared version
+    has moved, or when it is ALL_BANKS_LOCAL_RELOAD_SECONDS old and the
+    cache is not shared. The version is read at most every
+    ALL_BANKS_VERSION_CHECK_SECONDS, so most lookups touch neither the
+    database nor the shared cache.
+    """
+    now = time.monotonic()
+    if _is_due(now):
+        with _lock:
+            if _is_due(now):
+                version = _shared_version()
+                if version != _state['version'] or _is_expired(now):
+                    _load(version, now)
+                _state['checked'] = now
+    return _state
+
+
+def reset():
+    with _lock:
+        _state.update(version=None, checked=None, loaded=None, by_id={}, by_code={})
+
+
+def all_banks():
+    return list(_banks()['by_id'].values())
+
+
+def get_bank(pk):
+    """
+    Returns the AllBanks row with this id, or None. The instances are
+    shared by the whole process and must be treated as read-only.
+    """
+    return _banks()['by_id'].get(str(pk))
+
+
+def get_bank_by_code(bank_code):
+    return _banks()['by_code'].get(bank_code)
+
+
+def get_banks_by_code(bank_codes):
+    """
+    Returns {bank code: AllBanks} for the codes that exist.
+    """
+    by_code = _banks()['by_code']
+    return {code: by_code[code] for code in bank_codes if code in by_code}
+
+
+def attach_banks(accounts):
+    """
+    Fills in ``bank`` on Bank accounts from the cached list, so reading
+    account.bank does not query.
+    """
+    by_id = _banks()['by_id']
+    for account in accounts:
+        bank = by_id.get(str(account.bank_id))
+        if bank is not None:
+            account.bank = bank
+    return accounts
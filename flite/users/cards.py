@@ -0,0 +1,45 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ArchivedCard, Card
+
+ARCHIVED_FIELDS = [field.name for field in ArchivedCard._meta.concrete_fields
+                   if field.name not in ('id', 'card_id', 'owner', 'archived_on')]
+
+
+def archive_batch(cards, archived_on):
+    """
+    Copies ``cards`` into ArchivedCard and removes them from the live table
+    in one transaction.
+    """
+    with transaction.atomic():
+        ArchivedCard.objects.bulk_create([
+            ArchivedCard(card_id=card.pk, owner_id=card.owner_id, archived_on=archived_on,
+                         **{name: getattr(card, name) for name in ARCHIVED_FIELDS})
+            for card in cards
+        ])
+        Card.all_objects.filter(pk__in=[card.pk for card in cards]).delete()
+
+
+def archive_deleted_cards(after_days=None, batch_size=None):
+    """
+    Moves cards deleted more than ``after_days`` ago to ArchivedCard,
+    ``batch_size`` at a time in id order, so each transaction stays short
+    and the live table and its indexes only hold recently deleted cards.
+    Returns the number archived.
+    """
+    after_days = settings.CARD_ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    batch_size = batch_size or settings.CARD_ARCHIVE_BATCH_SIZE
+    now = timezone.now()
+    cutoff = now - timedelta(days=after_days)
+    due = Card.all_objects.filter(is_deleted=True, deleted_on__lt=cutoff).order_by('pk')
+
+    archived, last_pk = 0, 0
+    while True:
+        cards = list(due.filter(pk__gt=last_pk)[:batch_size])
+        if not cards:
+            return archived
+        archive_batch(cards, now)
+        archived += len(cards)
+        last_pk = cards[-1].pk
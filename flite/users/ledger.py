@@ -0,0 +1,245 @@
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Balance, BalanceSnapshot, BankTransfer, LedgerEntry, P2PTransfer, Transaction
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InsufficientFunds(LedgerError):
+    pass
+
+
+def to_amount(amount):
+    amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    if amount <= 0:
+        raise LedgerError("Amount must be positive")
+    return amount
+
+
+def new_reference():
+    return uuid.uuid4().hex
+
+
+def lock_balances(*owner_ids):
+    """
+    Locks the active balance of each owner with SELECT ... FOR UPDATE and
+    returns them keyed by owner id. Rows are locked in primary key order,
+    so two postings touching the same balances can never wait on each other
+    in a cycle. Must be called inside a transaction.
+    """
+    balances = (Balance.objects.select_for_update()
+                .filter(owner_id__in=set(owner_ids), active=True)
+                .order_by('pk'))
+    by_owner = {str(balance.owner_id): balance for balance in balances}
+    for owner_id in owner_ids:
+        if str(owner_id) not in by_owner:
+            raise LedgerError(f"User {owner_id} has no active balance")
+    return by_owner
+
+
+def post(record, movements):
+    """
+    Applies (locked balance, signed amount) movements and writes a ledger
+    entry for each, against ``record``. The balances are written as plain
+    values: the row locks make the read-modify-write safe.
+    """
+    entries = []
+    # All entries of one posting share its timestamp.
+    posted = timezone.now()
+    for balance, amount in movements:
+        balance.book_balance += amount
+        balance.available_balance += amount
+        Balance.objects.filter(pk=balance.pk).update(
+            book_balance=balance.book_balance, available_balance=balance.available_balance,
+        )
+        entries.append(LedgerEntry(balance=balance, transaction=record, amount=amount,
+                                   balance_after=balance.book_balance, created=posted))
+    LedgerEntry.objects.bulk_create(entries)
+
+
+def _check_funds(balance, amount):
+    if balance.available_balance < amount:
+        raise InsufficientFunds("Insufficient funds")
+
+
+def deposit(owner, amount, reference=None):
+    """
+    Credits money received from outside, e.g. a card charge, to the owner.
+    """
+    amount = to_amount(amount)
+    with transaction.atomic():
+        balance = lock_balances(owner.pk)[str(owner.pk)]
+        record = Transaction.objects.create(
+            owner=owner, reference=reference or new_reference(), status=Transaction.STATUS_SUCCESS,
+            amount=amount, new_balance=balance.book_balance + amount,
+        )
+        post(record, [(balance, amount)])
+    return record
+
+
+def transfer(sender, recipient, amount, reference=None):
+    """
+    Moves money between two users in one transaction, raising
+    InsufficientFunds when the sender cannot cover it.
+    """
+    amount = to_amount(amount)
+    if str(sender.pk) == str(recipient.pk):
+        raise LedgerError("Cannot transfer to the same user")
+    with transaction.atomic():
+        balances = lock_balances(sender.pk, recipient.pk)
+        source, destination = balances[str(sender.pk)], balances[str(recipient.pk)]
+        _check_funds(source, amount)
+        record = P2PTransfer.objects.create(
+            owner=sender, sender=sender, receipient=recipient, reference=reference or new_reference(),
+            status=Transaction.STATUS_SUCCESS, amount=amount, new_balance=source.book_balance - amount,
+        )
+        post(record, [(source, -amount), (destination, amount)])
+    return record
+
+
+def withdraw_to_bank(owner, bank, amount, reference=None):
+    """
+    Debits the owner and records a pending BankTransfer for the payout
+    processor to send. A failed payout is credited back against the same
+    transfer.
+    """
+    amount = to_amount(amount)
+    if str(bank.owner_id) != str(owner.pk):
+        raise LedgerError("Bank account belongs to another user")
+    with transaction.atomic():
+        balance = lock_balances(owner.pk)[str(owner.pk)]
+        _check_funds(balance, amount)
+        record = BankTransfer.objects.create(
+            owner=owner, bank=bank, reference=reference or new_reference(), status=Transaction.STATUS_PENDING,
+            amount=amount, new_balance=balance.book_balance - amount,
+        )
+        post(record, [(balance, -amount)])
+    return record
+
+
+def refund_bank_transfers(transfer_ids, from_status=Transaction.STATUS_PROCESSING):
+    """
+    Credits failed payouts back to their owners against the original
+    transfers and marks them failed. Only transfers still in ``from_status``
+    are touched, so a payout is never refunded twice. Returns the number
+    refunded.
+    """
+    with transaction.atomic():
+        transfers = list(BankTransfer.objects.select_for_update()
+                         .filter(pk__in=transfer_ids, status=from_status)
+                         .order_by('pk'))
+        if not transfers:
+            return 0
+        balances = lock_balances(*{str(transfer.owner_id) for transfer in transfers})
+        for transfer in transfers:
+            post(transfer, [(balances[str(transfer.owner_id)], transfer.amount)])
+        Transaction.objects.filter(pk__in=[transfer.pk for transfer in transfers]).update(
+            status=Transaction.STATUS_FAILED, modified=timezone.now(),
+        )
+    return len(transfers)
+
+
+def latest_snapshot(balance_id, at=None):
+    snapshots = BalanceSnapshot.objects.filter(balance_id=balance_id)
+    if at is not None:
+        snapshots = snapshots.filter(as_of__lte=at)
+    return snapshots.order_by('-as_of', '-last_entry_id').first()
+
+
+def ledger_balance(balance, at=None):
+    """
+    Returns the book balance according to the ledger, as of ``at`` when
+    given: the latest snapshot taken by then plus the entries posted after
+    it. The cost depends on the activity since that snapshot, not on the
+    age of the account.
+
+    Entries of one balance are posted under its row lock, so their ids and
+    timestamps increase together.
+    """
+    snapshot = latest_snapshot(balance.pk, at)
+    entries = LedgerEntry.objects.filter(balance_id=balance.pk)
+    total = Decimal('0.00')
+    if snapshot is not None:
+        entries = entries.filter(id__gt=snapshot.last_entry_id)
+        total = snapshot.book_balance
+    if at is not None:
+        entries = entries.filter(created__lte=at)
+    return total + (entries.aggregate(total=Sum('amount'))['total'] or 0)
+
+
+def _latest_snapshot_of(balance_ref):
+    return (BalanceSnapshot.objects.filter(balance=balance_ref)
+            .order_by('-as_of', '-last_entry_id'))
+
+
+def _since_snapshot(aggregate):
+    # Range scan of the (balance, id) index past the balance's latest snapshot.
+    return Subquery(LedgerEntry.objects.filter(balance=OuterRef('pk'), id__gt=OuterRef('snapshot_entry'))
+                    .order_by()
+                    .values('balance')
+                    .annotate(value=aggregate)
+                    .values('value'))
+
+
+def take_snapshots(min_entries=None, batch_size=1000):
+    """
+    Snapshots every balance with at least ``min_entries`` entries since its
+    latest snapshot. Each new snapshot is the previous one plus the sum of
+    those entries, so a run reads each balance's latest snapshot and the
+    entries posted since, never the full history. Returns the number of
+    snapshots written.
+    """
+    if min_entries is None:
+        min_entries = settings.BALANCE_SNAPSHOT_MIN_ENTRIES
+    latest = _latest_snapshot_of(OuterRef('pk'))
+    pending = (Balance.objects.order_by()
+               .annotate(snapshot_entry=Coalesce(Subquery(latest.values('last_entry_id')[:1]), Value(0)),
+                         previous=Subquery(latest.values('book_balance')[:1]))
+               .annotate(count=_since_snapshot(Count('id')))
+               .filter(count__gte=max(min_entries, 1))
+               .annotate(delta=_since_snapshot(Sum('amount')),
+                         last_entry=_since_snapshot(Max('id')),
+                         as_of=_since_snapshot(Max('created')))
+               .values_list('pk', 'previous', 'delta', 'last_entry', 'as_of'))
+
+    created = 0
+    batch = []
+    for balance_id, previous, delta, last_entry, as_of in pending.iterator(chunk_size=batch_size):
+        batch.append(BalanceSnapshot(balance_id=balance_id, last_entry_id=last_entry, as_of=as_of,
+                                     book_balance=(previous or Decimal('0.00')) + delta))
+        if len(batch) >= batch_size:
+            created += len(BalanceSnapshot.objects.bulk_create(batch))
+            batch = []
+    created += len(BalanceSnapshot.objects.bulk_create(batch))
+    return created
+
+
+def verify_balance(balance):
+    """
+    Replays a balance's entries in posting order and returns a description
+    of every disagreement with the entries' running balances, the snapshots
+    and the Balance row itself.
+    """
+    problems = []
+    snapshots = dict(balance.snapshots.values_list('last_entry_id', 'book_balance'))
+    running = Decimal('0.00')
+    entries = balance.ledger_entries.order_by('id').values_list('id', 'amount', 'balance_after')
+    for entry_id, amount, balance_after in entries.iterator():
+        running += amount
+        if balance_after != running:
+            problems.append(f"entry {entry_id}: balance_after {balance_after}, replayed {running}")
+        snapshot = snapshots.pop(entry_id, None)
+        if snapshot is not None and snapshot != running:
+            problems.append(f"snapshot at entry {entry_id}: stored {snapshot}, replayed {running}")
+    for entry_id in snapshots:
+        problems.append(f"snapshot at entry {entry_id}: entry does not belong to this balance")
+    if balance.book_balance != running:
+        problems.append(f"book balance {balance.book_balance}, replayed {running}")
+    return problems
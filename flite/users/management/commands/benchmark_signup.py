@@ -0,0 +1,57 @@
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from flite.users import services
+
+
+class Command(BaseCommand):
+    help = "Times per-user signup provisioning against the bulk path; all rows are rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000,
+                            help="Number of users provisioned by each path")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT on the bulk path")
+        parser.add_argument(
+            '--password', default=None,
+            help="Password given to every user; hashing then dominates both paths. "
+                 "Unusable passwords by default",
+        )
+
+    def rows(self, count, password):
+        prefix = uuid.uuid4().hex[:8]
+        for n in range(count):
+            name = f'bench-{prefix}-{n}'
+            yield {'username': name, 'email': f'{name}@example.com', 'password': password}
+
+    def measure(self, label, count, run):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries), transaction.atomic():
+            run()
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f"{label}: {count} users in {elapsed:.3f}s "
+            f"({count / elapsed:.0f} users/s, {queries} queries)"
+        )
+        return elapsed
+
+    def handle(self, *args, **options):
+        count, password = options['count'], options['password']
+        single = self.measure(
+            'provision_user', count,
+            lambda: [services.provision_user(**row) for row in self.rows(count, password)],
+        )
+        bulk = self.measure(
+            'bulk_provision_users', count,
+            lambda: services.bulk_provision_users(self.rows(count, password),
+                                                  batch_size=options['batch_size']),
+        )
+        self.stdout.write(self.style.SUCCESS(f"bulk path is {single / bulk:.1f}x faster"))
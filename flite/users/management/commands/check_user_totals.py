@@ -0,0 +1,53 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from flite.core import spending
+from flite.core.models import Transaction
+from flite.users.models import User
+
+
+def drifted_users():
+    """
+    Returns the users whose total_amount disagrees with the sum of their
+    transactions, annotated with both values.
+    """
+    totals = (Transaction.objects.filter(owner=OuterRef('pk'))
+              .order_by()
+              .values('owner')
+              .annotate(total=Sum('amount'))
+              .values('total'))
+    actual = Coalesce(
+        Subquery(totals, output_field=DecimalField(max_digits=14, decimal_places=2)),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    return (User.objects.with_total_amount()
+            .annotate(actual_amount=actual)
+            .filter(~Q(_total_amount=F('actual_amount'))))
+
+
+class Command(BaseCommand):
+    help = "Compares each user's total_amount with the true sum of their transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help="Rebuild the spending rollups that back total_amount when any user has drifted",
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(drifted_users().values('id', 'username', '_total_amount', 'actual_amount'))
+        for user in drifted:
+            self.stdout.write(
+                f"{user['id']} {user['username']}: "
+                f"stored {user['_total_amount']}, actual {user['actual_amount']}"
+            )
+        self.stdout.write(f"{len(drifted)} users have drifted")
+
+        if not drifted:
+            return
+        if not options['fix']:
+            raise CommandError("User totals have drifted; rerun with --fix to rebuild the spending rollups")
+        created = spending.rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} rollup rows"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from flite.users import ledger
+from flite.users.models import Balance
+
+
+class Command(BaseCommand):
+    help = "Replays every balance's ledger entries and compares them with the stored snapshots and balances"
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        for balance in Balance.objects.order_by('pk').iterator():
+            problems = ledger.verify_balance(balance)
+            if problems:
+                mismatched += 1
+            for problem in problems:
+                self.stdout.write(f"{balance.pk}: {problem}")
+        self.stdout.write(f"{mismatched} balances disagree with their ledger")
+        if mismatched:
+            raise CommandError("Balance verification failed")
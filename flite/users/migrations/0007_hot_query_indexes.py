@@ -0,0 +1,22 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_auto_20240501_1147'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='referral_code',
+            field=models.CharField(db_index=True, max_length=120),
+        ),
+        migrations.AddIndex(
+            model_name='newuserphoneverification',
+            index=models.Index(fields=['phone_number', 'verification_code'], name='users_phone_verify_code_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:33
+
+from django.db import migrations
+import flite.users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', flite.users.models.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:35
+
+import uuid
+from django.db import migrations, models
+
+
+def normalize_referral_codes(apps, schema_editor):
+    """
+    Lower-cases stored codes and reissues any duplicates, which the old
+    probe-then-insert generator could produce under concurrent signups,
+    so the unique index can be built.
+    """
+    UserProfile = apps.get_model('users', 'UserProfile')
+    seen = set()
+    for profile in UserProfile.objects.order_by('created', 'id').iterator():
+        code = profile.referral_code.lower()
+        while not code or code in seen:
+            code = uuid.uuid4().hex[0:8]
+        seen.add(code)
+        if code != profile.referral_code:
+            UserProfile.objects.filter(pk=profile.pk).update(referral_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_user_queryset_manager'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_referral_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='referral_code',
+            field=models.CharField(max_length=120, unique=True),
+        ),
+    ]
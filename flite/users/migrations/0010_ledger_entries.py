@@ -0,0 +1,77 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:40
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def post_opening_entries(apps, schema_editor):
+    """
+    Balances that already hold money get an opening entry for it, backed by
+    a Transaction, so that every balance equals the sum of its entries. The
+    entry is dated when the balance was created, so it comes first in time
+    as well as by id.
+    """
+    Balance = apps.get_model('users', 'Balance')
+    Transaction = apps.get_model('users', 'Transaction')
+    LedgerEntry = apps.get_model('users', 'LedgerEntry')
+    balances = (Balance.objects.exclude(book_balance=0)
+                .filter(ledger_entries__isnull=True)
+                .order_by('pk'))
+    for balance in balances.iterator():
+        record = Transaction.objects.create(
+            owner_id=balance.owner_id, reference=f'opening-{balance.pk}', status='success',
+            amount=balance.book_balance, new_balance=balance.book_balance,
+        )
+        LedgerEntry.objects.create(balance=balance, transaction=record, amount=balance.book_balance,
+                                   balance_after=balance.book_balance, created=balance.created)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_unique_referral_code'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balance',
+            name='available_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='balance',
+            name='book_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='new_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('balance', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='users.balance')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='users.transaction')),
+            ],
+            options={
+                'verbose_name_plural': 'Ledger entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['balance', 'id'], name='users_ledger_balance_id_idx'),
+        ),
+        migrations.RunPython(post_opening_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_ledger_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified', models.DateTimeField(auto_now=True, null=True)),
+                ('book_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('as_of', models.DateTimeField()),
+                ('balance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='users.balance')),
+                ('last_entry', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='users.ledgerentry')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='balancesnapshot',
+            index=models.Index(fields=['balance', 'as_of'], name='users_snapshot_as_of_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='balancesnapshot',
+            constraint=models.UniqueConstraint(fields=('balance', 'last_entry'), name='users_snapshot_unique_entry'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_balance_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'created'], name='users_txn_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.manager
+import django.utils.timezone
+
+
+def backfill_deleted_on(apps, schema_editor):
+    """
+    Cards deleted before deleted_on existed count as deleted now, so they
+    are archived one full retention period after this migration.
+    """
+    Card = apps.get_model('users', 'Card')
+    Card.all_objects.filter(is_deleted=True, deleted_on__isnull=True).update(deleted_on=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_payout_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('authorization_code', models.CharField(max_length=200)),
+                ('ctype', models.CharField(max_length=200)),
+                ('cbin', models.CharField(default=None, max_length=200)),
+                ('cbrand', models.CharField(default=None, max_length=200)),
+                ('country_code', models.CharField(default=None, max_length=200)),
+                ('first_name', models.CharField(default=None, max_length=200)),
+                ('last_name', models.CharField(default=None, max_length=200)),
+                ('number', models.CharField(max_length=200)),
+                ('bank', models.CharField(max_length=200)),
+                ('expiry_month', models.CharField(max_length=10)),
+                ('expiry_year', models.CharField(max_length=10)),
+                ('created_on', models.DateTimeField(default=django.utils.timezone.now)),
+                ('card_id', models.IntegerField(unique=True)),
+                ('deleted_on', models.DateTimeField()),
+                ('archived_on', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='card',
+            options={'base_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelManagers(
+            name='card',
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='deleted_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_deleted_on, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['owner'], name='users_card_active_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_on'], name='users_card_deleted_on_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedcard',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_cards', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
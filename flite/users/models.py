@@ -1,24 +1,84 @@
 import uuid
-from django.db import models
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.dispatch import receiver
-from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
+from django.db.models.signals import post_delete, post_save
 from rest_framework.authtoken.models import Token
-from flite.core.models import BaseModel
+from flite.core.models import BaseModel, SpendingRollup
 from phonenumber_field.modelfields import PhoneNumberField
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .authentication import invalidate_cached_tokens
+from .banks import invalidate_banks
+
+def _monthly_rollups():
+    # The monthly rollups already hold every transaction, maintained on write,
+    # so a user's total is a sum over a few rows per month and category rather
+    # than over all of their transactions.
+    return SpendingRollup.objects.filter(period=SpendingRollup.PERIOD_MONTH).order_by()
+
+
+class UserQuerySet(models.QuerySet):
+
+    def with_total_amount(self):
+        """
+        Annotates each user's transaction total, read by User.total_amount
+        without a query per row.
+        """
+        totals = (_monthly_rollups().filter(owner=OuterRef('pk'))
+                  .values('owner')
+                  .annotate(total=Sum('total'))
+                  .values('total'))
+        return self.annotate(_total_amount=Coalesce(
+            Subquery(totals, output_field=DecimalField(max_digits=14, decimal_places=2)),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ))
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
+    objects = UserManager()
+
     def __str__(self):
         return self.username
 
     @property
     def total_amount(self):
-        return self.transactions.aggregate(total=Sum('amount'))['total'] or 0
+        if hasattr(self, '_total_amount'):
+            # Loaded by with_total_amount() or prefetch_total_amounts().
+            return self._total_amount
+        # Not kept on the instance, so a later write through it is reflected.
+        return _total_amounts([self.pk]).get(str(self.pk), Decimal('0.00'))
+
+
+def _total_amounts(owner_ids):
+    rows = (_monthly_rollups()
+            .filter(owner__in=owner_ids)
+            .values('owner')
+            .annotate(total=Sum('total'))
+            .values_list('owner', 'total'))
+    return {str(owner_id): total for owner_id, total in rows}
+
+
+def prefetch_total_amounts(users):
+    """
+    Loads total_amount for a list of already fetched users with one query.
+    """
+    users = list(users)
+    totals = _total_amounts([user.pk for user in users])
+    for user in users:
+        user._total_amount = totals.get(str(user.pk), Decimal('0.00'))
+    return users
+
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
@@ -27,6 +87,17 @@ def create_auth_token(sender, instance=None, created=False, **kwargs):
         UserProfile.objects.create(user=instance)
         Balance.objects.create(owner=instance)
 
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance=None, created=False, raw=False, **kwargs):
+    # Cached credentials carry a copy of the user; drop them so deactivation
+    # and profile edits take effect immediately.
+    if not created and not raw:
+        invalidate_cached_tokens(*Token.objects.filter(user=instance).values_list('key', flat=True))
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance=None, **kwargs):
+    invalidate_cached_tokens(instance.key)
+
 class Phonenumber(BaseModel):
     number = models.CharField(max_length=24)
     is_verified = models.BooleanField(default=False)
@@ -38,26 +109,33 @@ class Phonenumber(BaseModel):
 
 
 class UserProfile(BaseModel):
-    referral_code = models.CharField(max_length=120)
+    # Codes are stored lower case; the unique index also serves lookups.
+    referral_code = models.CharField(max_length=120, unique=True)
     user = models.OneToOneField('users.User',on_delete=models.CASCADE)
 
+    MAX_REFERRAL_CODE_ATTEMPTS = 5
+
 
     def save(self, *args, **kwargs):
-        if not self.referral_code:
-            self.referral_code = self.generate_new_referal_code()
-        return super(UserProfile, self).save(*args, **kwargs)
+        if self.referral_code:
+            return super(UserProfile, self).save(*args, **kwargs)
+        # Let the unique index detect the rare collision instead of probing
+        # the table before every insert.
+        for attempt in range(self.MAX_REFERRAL_CODE_ATTEMPTS):
+            self.referral_code = self.referral_code_candidate()
+            try:
+                with transaction.atomic():
+                    return super(UserProfile, self).save(*args, **kwargs)
+            except IntegrityError:
+                collided = UserProfile.objects.filter(referral_code=self.referral_code).exists()
+                self.referral_code = ''
+                if not collided or attempt == self.MAX_REFERRAL_CODE_ATTEMPTS - 1:
+                    raise
 
 
-    def generate_new_referal_code(self):
-        """
-        Returns a unique passcode
-        """
-        def _passcode():
-            return str(uuid.uuid4().hex)[0:8]
-        passcode = _passcode()
-        while UserProfile.objects.filter(referral_code=passcode).exists():
-            passcode = _passcode()
-        return passcode
+    @staticmethod
+    def referral_code_candidate():
+        return str(uuid.uuid4().hex)[0:8]
 
 
 
@@ -73,6 +151,9 @@ class NewUserPhoneVerification(BaseModel):
 
     class Meta:
         verbose_name_plural = "New User Verification Codes"
+        indexes = [
+            models.Index(fields=['phone_number', 'verification_code'], name='users_phone_verify_code_idx'),
+        ]
 
 
 
@@ -87,8 +168,10 @@ class Referral(BaseModel):
 class Balance(BaseModel):
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
-    book_balance = models.FloatField(default=0.0) 
-    available_balance = models.FloatField(default=0.0) 
+    # Written only by flite.users.ledger, under a row lock, alongside a
+    # LedgerEntry for every change.
+    book_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    available_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
     active = models.BooleanField(default=True)
 
     class Meta:
@@ -107,6 +190,11 @@ class AllBanks(BaseModel):
     class Meta:
         verbose_name_plural = "All Banks"
 
+@receiver(post_save, sender=AllBanks)
+@receiver(post_delete, sender=AllBanks)
+def invalidate_bank_list(sender, **kwargs):
+    invalidate_banks()
+
 
 class Bank(models.Model):
 
@@ -117,11 +205,22 @@ class Bank(models.Model):
     account_type = models.CharField(max_length=50)
     
 class Transaction(BaseModel):
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction')
     reference = models.CharField(max_length=200)
     status = models.CharField(max_length=200)
-    amount = models.FloatField(default=0.0)
-    new_balance = models.FloatField(default=0.0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    new_balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        indexes = [
+            # Serves the payout queue: oldest transfers in a given status.
+            models.Index(fields=['status', 'created'], name='users_txn_status_created_idx'),
+        ]
 
 
 
@@ -141,9 +240,72 @@ class P2PTransfer(Transaction):
 
 
 
-class Card(models.Model):
-    
-    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+class ImmutableLedgerEntry(Exception):
+    pass
+
+
+class LedgerEntryQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        raise ImmutableLedgerEntry("Ledger entries cannot be changed")
+
+    def delete(self):
+        raise ImmutableLedgerEntry("Ledger entries cannot be deleted")
+
+
+class LedgerEntry(models.Model):
+    """
+    One movement of money on a balance. Entries are only ever inserted, by
+    flite.users.ledger; a balance always equals the sum of its entries.
+    Balances that predate the ledger start with an opening entry.
+    """
+    # Sequential, so entries can be read back in posting order.
+    id = models.BigAutoField(primary_key=True)
+    balance = models.ForeignKey(Balance, on_delete=models.PROTECT, related_name='ledger_entries')
+    transaction = models.ForeignKey(Transaction, on_delete=models.PROTECT, related_name='ledger_entries')
+    # Positive for credits, negative for debits.
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=14, decimal_places=2)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = LedgerEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "Ledger entries"
+        indexes = [
+            models.Index(fields=['balance', 'id'], name='users_ledger_balance_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ImmutableLedgerEntry("Ledger entries cannot be changed")
+        return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ImmutableLedgerEntry("Ledger entries cannot be deleted")
+
+
+class BalanceSnapshot(BaseModel):
+    """
+    A balance as of one ledger entry, taken periodically so that reading a
+    balance only sums the entries written since the latest snapshot.
+    """
+    balance = models.ForeignKey(Balance, on_delete=models.CASCADE, related_name='snapshots')
+    last_entry = models.ForeignKey(LedgerEntry, on_delete=models.PROTECT, related_name='+')
+    book_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    # When last_entry was posted.
+    as_of = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['balance', 'last_entry'], name='users_snapshot_unique_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['balance', 'as_of'], name='users_snapshot_as_of_idx'),
+        ]
+
+
+class CardDetails(models.Model):
     authorization_code = models.CharField(max_length=200)
     ctype = models.CharField(max_length=200)
     cbin = models.CharField(max_length=200, default=None)
@@ -155,17 +317,54 @@ class Card(models.Model):
     bank = models.CharField(max_length=200)
     expiry_month = models.CharField(max_length=10)
     expiry_year = models.CharField(max_length=10)
-    is_active = models.BooleanField(default=True)
-    is_deleted = models.BooleanField(default=False)
     created_on = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        abstract = True
+
     def __str__(self):
         return self.number
 
+
+class ActiveCardManager(models.Manager):
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class Card(CardDetails):
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    is_active = models.BooleanField(default=True)
+    is_deleted = models.BooleanField(default=False)
+    deleted_on = models.DateTimeField(blank=True, null=True)
+
+    # Deleted cards are only reachable through all_objects.
+    objects = ActiveCardManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        base_manager_name = 'all_objects'
+        indexes = [
+            # Only live cards are indexed, so "list my cards" stays as fast
+            # however many deleted rows pile up.
+            models.Index(fields=['owner'], name='users_card_active_owner_idx', condition=Q(is_deleted=False)),
+            # Lets the archival job find long-deleted cards without a scan.
+            models.Index(fields=['deleted_on'], name='users_card_deleted_on_idx',
+                         condition=Q(is_deleted=True)),
+        ]
+
     def delete(self):
         self.is_active = False
         self.is_deleted = True
+        self.deleted_on = timezone.now()
         self.save()
 
 
-    
+class ArchivedCard(CardDetails):
+    """
+    A card moved out of the live table some time after it was deleted.
+    """
+    card_id = models.IntegerField(unique=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_cards')
+    deleted_on = models.DateTimeField()
+    archived_on = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,145 @@
+from collections import defaultdict
+from datetime import timedelta
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from . import banks, ledger
+from .models import BankTransfer, Transaction
+
+# Batches sent through LocmemPayoutGateway, for tests and local development.
+outbox = []
+
+
+class PayoutGatewayError(Exception):
+    """
+    Raised when the outcome of a batch is unknown. Its transfers stay
+    claimed until requeue_stale_payouts sends them again.
+    """
+
+
+class BasePayoutGateway:
+    """
+    Pays batches of transfers into accounts at one bank. Payouts carry the
+    transfer reference, which the provider must treat as an idempotency key:
+    a batch whose outcome was lost is sent again with the same references.
+    """
+
+    def send_batch(self, bank_code, payouts):
+        """
+        Sends dicts of reference, account_number, account_name and amount,
+        and returns the references the provider rejected.
+        """
+        raise NotImplementedError
+
+
+class LocmemPayoutGateway(BasePayoutGateway):
+    """
+    Appends (bank code, payouts) to flite.users.payouts.outbox and accepts
+    every payout.
+    """
+
+    def send_batch(self, bank_code, payouts):
+        outbox.append((bank_code, payouts))
+        return set()
+
+
+_gateways = {}
+
+
+def get_gateway():
+    path = settings.PAYOUT_GATEWAY
+    if path not in _gateways:
+        _gateways[path] = import_string(path)()
+    return _gateways[path]
+
+
+@worker_process_init.connect
+def reset_gateways(**kwargs):
+    _gateways.clear()
+
+
+def claim_payouts(limit):
+    """
+    Moves up to ``limit`` of the oldest pending transfers to processing and
+    returns their ids. Rows another worker is claiming are skipped rather
+    than waited for, so parallel workers take disjoint chunks.
+    """
+    with transaction.atomic():
+        ids = list(BankTransfer.objects.select_for_update(skip_locked=True)
+                   .filter(status=Transaction.STATUS_PENDING)
+                   .order_by('created')
+                   .values_list('pk', flat=True)[:limit])
+        if ids:
+            Transaction.objects.filter(pk__in=ids).update(status=Transaction.STATUS_PROCESSING,
+                                                          modified=timezone.now())
+    return ids
+
+
+def send_payouts(transfer_ids):
+    """
+    Sends claimed transfers to the gateway grouped by destination bank, in
+    batches of PAYOUT_BATCH_SIZE, then settles them with one UPDATE for the
+    paid ones and one refund posting for the rejected ones. Returns the
+    numbers paid and refunded.
+    """
+    transfers = list(BankTransfer.objects.filter(pk__in=transfer_ids, status=Transaction.STATUS_PROCESSING)
+                     .select_related('bank')
+                     .order_by('created'))
+    # Bank codes come from the process-local bank list rather than a join.
+    banks.attach_banks([transfer.bank for transfer in transfers])
+    by_bank = defaultdict(list)
+    for transfer in transfers:
+        by_bank[transfer.bank.bank.bank_code].append(transfer)
+
+    gateway = get_gateway()
+    size = settings.PAYOUT_BATCH_SIZE
+    paid, rejected = [], []
+    for bank_code, bank_transfers in by_bank.items():
+        for start in range(0, len(bank_transfers), size):
+            batch = bank_transfers[start:start + size]
+            try:
+                failed = gateway.send_batch(bank_code, [{
+                    'reference': transfer.reference,
+                    'account_number': transfer.bank.account_number,
+                    'account_name': transfer.bank.account_name,
+                    'amount': str(transfer.amount),
+                } for transfer in batch])
+            except PayoutGatewayError:
+                continue
+            for transfer in batch:
+                (rejected if transfer.reference in failed else paid).append(transfer.pk)
+
+    if paid:
+        Transaction.objects.filter(pk__in=paid, status=Transaction.STATUS_PROCESSING).update(
+            status=Transaction.STATUS_SUCCESS, modified=timezone.now(),
+        )
+    refunded = ledger.refund_bank_transfers(rejected) if rejected else 0
+    return len(paid), refunded
+
+
+def process_payouts(limit=None):
+    """
+    Claims and sends chunks of pending transfers until none are left.
+    Returns the number of transfers handled.
+    """
+    limit = limit or settings.PAYOUT_CLAIM_SIZE
+    handled = 0
+    while True:
+        ids = claim_payouts(limit)
+        if not ids:
+            return handled
+        send_payouts(ids)
+        handled += len(ids)
+
+
+def requeue_stale_payouts():
+    """
+    Returns transfers that have been processing for longer than
+    PAYOUT_STALE_SECONDS, e.g. after a worker died mid-batch, to the queue.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.PAYOUT_STALE_SECONDS)
+    return Transaction.objects.filter(
+        banktransfer__isnull=False, status=Transaction.STATUS_PROCESSING, modified__lt=cutoff,
+    ).update(status=Transaction.STATUS_PENDING, modified=timezone.now())
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import User, NewUserPhoneVerification,UserProfile,Referral
-from . import utils
+from .models import User, NewUserPhoneVerification,UserProfile
+from phonenumber_field.serializerfields import PhoneNumberField
+from . import services, verification
 
 class UserSerializer(serializers.ModelSerializer):
 
@@ -16,31 +17,21 @@ class CreateUserSerializer(serializers.ModelSerializer):
 
     def validate_referral_code(self, code):
         
-        self.reffered_profile = UserProfile.objects.filter(referral_code=code.lower())
-        is_valid_code = self.reffered_profile.exists()
-        if not is_valid_code:
+        try:
+            profile = UserProfile.objects.select_related('user').get(referral_code=code.lower())
+        except UserProfile.DoesNotExist:
             raise serializers.ValidationError(
                 "Referral code does not exist"
             )
-        else:
-            return code
+        self.referrer = profile.user
+        return code
 
     def create(self, validated_data):
-        # call create_user on user object. Without this
+        # provision_user calls create_user on user object. Without this
         # the password will be stored in plain text.
-        referral_code = None
-        if 'referral_code' in validated_data:
-            referral_code = validated_data.pop('referral_code',None)
-            
-        user = User.objects.create_user(**validated_data)
-
-        if referral_code:
-            referral =Referral()
-            referral.owner = self.reffered_profile.first().user
-            referral.referred = user
-            referral.save()
-
-        return user
+        referral_code = validated_data.pop('referral_code', None)
+        referrer = self.referrer if referral_code else None
+        return services.provision_user(referrer=referrer, **validated_data)
 
     class Meta:
         model = User
@@ -51,22 +42,26 @@ class CreateUserSerializer(serializers.ModelSerializer):
 
 
 class SendNewPhonenumberSerializer(serializers.ModelSerializer):
+    # Declared explicitly so that resending to a number does not trip the
+    # model's unique validator, which would also query the database.
+    phone_number = PhoneNumberField(write_only=True)
 
     def create(self, validated_data):
         phone_number = validated_data.get("phone_number", None) 
         email = validated_data.get("email", None)
 
-        obj, code = utils.send_mobile_signup_sms(phone_number, email)
-        
+        # The code only goes out by SMS; returning it would let anyone
+        # verify a number they do not own.
+        verification_id, _ = verification.get_backend().send(phone_number, email)
+
         return {
-            "verification_code":code,
-            "id":obj.id
+            "id":verification_id
         }
 
     class Meta:
         model = NewUserPhoneVerification
-        fields = ('id', 'phone_number', 'verification_code', 'email',)
-        extra_kwargs = {'phone_number': {'write_only': True, 'required':True}, 'email': {'write_only': True}, }
-        read_only_fields = ('id', 'verification_code')
+        fields = ('id', 'phone_number', 'email',)
+        extra_kwargs = {'email': {'write_only': True}, }
+        read_only_fields = ('id',)
         
     
\ No newline at end of file
@@ -0,0 +1,67 @@
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+from .models import User, UserProfile, Referral, Balance
+
+
+def provision_user(referrer=None, **fields):
+    """
+    Creates a user with their token, profile and balance, and the referral
+    when ``referrer`` is given, in a single transaction so that signup
+    commits once instead of once per row.
+    """
+    with transaction.atomic():
+        # create_user hashes the password; the post_save receiver adds the
+        # token, profile and balance inside this transaction.
+        user = User.objects.create_user(**fields)
+        if referrer is not None:
+            Referral.objects.create(owner=referrer, referred=user)
+    return user
+
+
+def _unique_referral_codes(count, batch_size):
+    codes = set()
+    while len(codes) < count:
+        candidates = list({UserProfile.referral_code_candidate() for _ in range(count - len(codes))} - codes)
+        # One probe per batch of codes rather than one per code.
+        for start in range(0, len(candidates), batch_size):
+            chunk = set(candidates[start:start + batch_size])
+            taken = set(UserProfile.objects.filter(referral_code__in=chunk)
+                        .values_list('referral_code', flat=True))
+            codes |= chunk - taken
+    return list(codes)
+
+
+def bulk_provision_users(rows, batch_size=1000):
+    """
+    Creates users from dicts of User fields with multi-row INSERTs, adding
+    the token, profile and balance rows the post_save receiver would. A
+    ``password`` key is hashed as create_user would; rows without one get
+    an unusable password. Signals are not sent.
+    """
+    users = []
+    for row in rows:
+        row = dict(row)
+        password = row.pop('password', None)
+        row['username'] = User.normalize_username(row['username'])
+        row['email'] = User.objects.normalize_email(row.get('email', ''))
+        user = User(**row)
+        user.password = make_password(password)
+        users.append(user)
+
+    codes = _unique_referral_codes(len(users), batch_size)
+    tokens = []
+    for user in users:
+        token = Token(user=user)
+        token.key = token.generate_key()
+        tokens.append(token)
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        Token.objects.bulk_create(tokens, batch_size=batch_size)
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, referral_code=code) for user, code in zip(users, codes)],
+            batch_size=batch_size,
+        )
+        Balance.objects.bulk_create([Balance(owner=user) for user in users], batch_size=batch_size)
+    return users
@@ -0,0 +1,163 @@
+import json
+import urllib3
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from flite.core.cache import require_shared_cache
+
+# Messages sent through LocmemSMSGateway, for tests and local development.
+outbox = []
+
+# Queued messages older than this are dropped rather than delivered late.
+MESSAGE_TIMEOUT = 600
+
+SEQUENCE_KEY = 'sms-queue:sequence'
+CURSOR_KEY = 'sms-queue:cursor'
+FLUSH_PENDING_KEY = 'sms-queue:flush-pending'
+FLUSH_LOCK_KEY = 'sms-queue:flush-lock'
+# Written by a flush into a slot whose message never arrived, so that the
+# producer holding that slot moves on to a new one instead.
+ABANDONED = 'abandoned'
+
+
+class SMSGatewayError(Exception):
+    pass
+
+
+class BaseSMSGateway:
+    """
+    Delivers batches of (phone number, body) pairs through one provider.
+    """
+
+    def send_batch(self, messages):
+        raise NotImplementedError
+
+
+class LocmemSMSGateway(BaseSMSGateway):
+    """
+    Appends messages to flite.users.sms.outbox instead of sending them.
+    """
+
+    def send_batch(self, messages):
+        outbox.extend(messages)
+
+
+class HTTPSMSGateway(BaseSMSGateway):
+    """
+    Posts each batch as one JSON request to SMS_GATEWAY_URL over a pooled,
+    keep-alive connection that lives as long as the worker process.
+    """
+
+    def __init__(self):
+        self.url = settings.SMS_GATEWAY_URL
+        self.http = urllib3.PoolManager(
+            maxsize=4,
+            headers={
+                'Authorization': f'Bearer {settings.SMS_GATEWAY_API_KEY}',
+                'Content-Type': 'application/json',
+            },
+            timeout=urllib3.Timeout(connect=2.0, read=10.0),
+            # Failed batches are retried by the task, with backoff.
+            retries=False,
+        )
+
+    def send_batch(self, messages):
+        body = json.dumps({'messages': [{'to': to, 'body': text} for to, text in messages]})
+        try:
+            response = self.http.request('POST', self.url, body=body)
+        except urllib3.exceptions.HTTPError as exc:
+            raise SMSGatewayError(str(exc)) from exc
+        if response.status >= 300:
+            raise SMSGatewayError(f'SMS gateway returned {response.status}')
+
+
+_gateways = {}
+
+
+def get_gateway():
+    """
+    Returns this process's instance of the SMS_GATEWAY class, so that its
+    connection pool is shared by every batch the process sends.
+    """
+    path = settings.SMS_GATEWAY
+    if path not in _gateways:
+        _gateways[path] = import_string(path)()
+    return _gateways[path]
+
+
+def check_configuration():
+    """
+    Messages are queued in the cache by web processes and drained by a
+    worker, so anything but the local stub gateway needs a shared cache:
+    with a per-process one the worker finds the queue empty and no message
+    is ever sent.
+    """
+    if not issubclass(import_string(settings.SMS_GATEWAY), LocmemSMSGateway):
+        require_shared_cache('The SMS queue')
+
+
+@worker_process_init.connect
+def reset_gateways(**kwargs):
+    # Pools must not be shared across the fork into prefork worker children.
+    _gateways.clear()
+
+
+def _message_key(index):
+    return f'sms-queue:message:{index}'
+
+
+def enqueue(phone_number, body):
+    """
+    Appends a message to the shared queue, claiming the next slot of a
+    counter in the cache.
+    """
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    while True:
+        index = cache.incr(SEQUENCE_KEY)
+        if cache.add(_message_key(index), (str(phone_number), body), timeout=MESSAGE_TIMEOUT):
+            return index
+
+
+def mark_flush_pending():
+    """
+    Returns True for the first message since the last flush started, which
+    is the one that has to schedule the next flush.
+    """
+    return cache.add(FLUSH_PENDING_KEY, True, timeout=settings.SMS_FLUSH_SECONDS + 300)
+
+
+def clear_flush_pending():
+    cache.delete(FLUSH_PENDING_KEY)
+
+
+def drain():
+    """
+    Removes and returns every queued message in order, or None when another
+    process is already draining the queue.
+    """
+    if not cache.add(FLUSH_LOCK_KEY, True, timeout=60):
+        return None
+    try:
+        # Cleared before reading, so messages queued from here on schedule
+        # a flush of their own.
+        clear_flush_pending()
+        end = cache.get(SEQUENCE_KEY, 0)
+        start = cache.get(CURSOR_KEY, 0)
+        if start > end:
+            # The counter was evicted and started again.
+            start = 0
+        keys = [_message_key(index) for index in range(start + 1, end + 1)]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found and not cache.add(key, ABANDONED, timeout=MESSAGE_TIMEOUT):
+                # The producer filled its slot after get_many.
+                found[key] = cache.get(key)
+        delivered = [key for key in keys if found.get(key) not in (None, ABANDONED)]
+        cache.set(CURSOR_KEY, end, timeout=None)
+        # Abandoned markers are left to expire so a late producer still
+        # finds its slot taken.
+        cache.delete_many(delivered)
+        return [found[key] for key in delivered]
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
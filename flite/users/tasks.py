@@ -1 +1,95 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from kombu.exceptions import OperationalError
+from . import cards, ledger, payouts, sms, throttling
 
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    ignore_result=True,
+    autoretry_for=(sms.SMSGatewayError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def send_sms_batch(messages):
+    """
+    Sends one batch, or puts it back on the queue for when the shared
+    SMS_GATEWAY_RATE_LIMIT bucket has a token. Celery's own rate_limit
+    would apply to each worker separately.
+    """
+    throttle = throttling.SMSGatewayThrottle()
+    if not throttle.take():
+        send_sms_batch.apply_async((messages,), countdown=throttle.wait())
+        return
+    sms.get_gateway().send_batch(messages)
+
+
+@shared_task(ignore_result=True)
+def flush_sms_queue():
+    """
+    Drains the shared SMS queue and hands it to send_sms_batch in batches of
+    SMS_BATCH_SIZE.
+    """
+    messages = sms.drain()
+    if messages is None:
+        # Another flush holds the queue; try again once it is done.
+        flush_sms_queue.apply_async(countdown=settings.SMS_FLUSH_SECONDS)
+        return
+    size = settings.SMS_BATCH_SIZE
+    for start in range(0, len(messages), size):
+        send_sms_batch.delay(messages[start:start + size])
+
+
+def schedule_flush():
+    try:
+        flush_sms_queue.apply_async(countdown=settings.SMS_FLUSH_SECONDS)
+    except OperationalError:
+        # The messages stay queued, and the next one schedules the flush.
+        sms.clear_flush_pending()
+        logger.exception("Could not schedule an SMS flush")
+
+
+def queue_sms(phone_number, body):
+    """
+    Queues a message for the next flush. Only the first message of each
+    SMS_FLUSH_SECONDS window publishes a task, so a burst of signups becomes
+    a few batch requests to the provider instead of one per message. The
+    task is published after commit, and a broker outage does not fail the
+    request that queued the message.
+    """
+    sms.enqueue(phone_number, body)
+    if sms.mark_flush_pending():
+        transaction.on_commit(schedule_flush)
+
+
+def send_sms_verification_code(phone_number, code):
+    queue_sms(phone_number, f'Your Flite verification code is {code}')
+
+
+@shared_task(ignore_result=True)
+def take_balance_snapshots():
+    ledger.take_snapshots()
+
+
+@shared_task(ignore_result=True)
+def process_bank_payouts():
+    payouts.process_payouts()
+
+
+@shared_task(ignore_result=True)
+def dispatch_bank_payouts():
+    """
+    Requeues stalled payouts and starts PAYOUT_WORKERS drains, which split
+    the queue between them.
+    """
+    payouts.requeue_stale_payouts()
+    for _ in range(settings.PAYOUT_WORKERS):
+        process_bank_payouts.delay()
+
+
+@shared_task(ignore_result=True)
+def archive_deleted_cards():
+    cards.archive_deleted_cards()
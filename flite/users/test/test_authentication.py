@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import TestCase
+from nose.tools import eq_
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from ..authentication import CachedTokenAuthentication
+from .factories import UserFactory
+
+
+class TestCachedTokenAuthentication(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.key = self.user.auth_token.key
+        self.authentication = CachedTokenAuthentication()
+
+    def test_repeat_lookups_are_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            user, token = self.authentication.authenticate_credentials(self.key)
+        eq_(str(user.pk), str(self.user.pk))
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(self.key)
+        eq_(str(user.pk), str(self.user.pk))
+        eq_(token.key, self.key)
+
+    def test_unknown_token_is_rejected(self):
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials('not-a-token')
+
+    def test_deleted_token_is_rejected(self):
+        self.authentication.authenticate_credentials(self.key)
+        Token.objects.filter(key=self.key).delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_deactivated_user_is_rejected(self):
+        self.authentication.authenticate_credentials(self.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_user_changes_are_visible(self):
+        self.authentication.authenticate_credentials(self.key)
+        self.user.first_name = 'Changed'
+        self.user.save()
+        user, _ = self.authentication.authenticate_credentials(self.key)
+        eq_(user.first_name, 'Changed')
@@ -0,0 +1,80 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from nose.tools import eq_
+from ..models import AllBanks, Bank
+from .. import banks
+from .factories import UserFactory
+
+
+@override_settings(ALL_BANKS_VERSION_CHECK_SECONDS=0)
+class TestBankCache(TestCase):
+
+    def setUp(self):
+        banks.reset()
+        self.addCleanup(banks.reset)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = AllBanks.objects.create(name='First Bank', acronym='FBN', bank_code='011')
+            self.second = AllBanks.objects.create(name='Second Bank', acronym='SB', bank_code='022')
+
+    def test_lookups_are_served_from_memory(self):
+        banks.all_banks()
+        with self.assertNumQueries(0):
+            eq_(banks.get_bank(self.first.pk).name, 'First Bank')
+            eq_(banks.get_bank_by_code('022').pk, self.second.pk)
+            eq_(set(banks.get_banks_by_code(['011', '022', '999'])), {'011', '022'})
+            eq_(banks.get_bank_by_code('999'), None)
+
+    def test_admin_edits_reload_the_list(self):
+        banks.all_banks()
+        self.first.name = 'Renamed Bank'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        eq_(banks.get_bank(self.first.pk).name, 'Renamed Bank')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        eq_(banks.get_bank_by_code('022'), None)
+
+    @override_settings(ALL_BANKS_VERSION_CHECK_SECONDS=3600)
+    def test_version_is_not_rechecked_within_the_interval(self):
+        banks.all_banks()
+        banks.bump_version()
+        AllBanks.objects.filter(pk=self.first.pk).update(name='Changed')
+        eq_(banks.get_bank(self.first.pk).name, 'First Bank')
+
+    @override_settings(ALL_BANKS_LOCAL_RELOAD_SECONDS=60)
+    def test_process_local_cache_reloads_a_stale_list(self):
+        # Another process's edit: the row changes but this process's cache
+        # never sees the version bump.
+        now = banks.time.monotonic()
+        banks.all_banks()
+        AllBanks.objects.filter(pk=self.first.pk).update(name='Changed')
+        with mock.patch.object(banks.time, 'monotonic', return_value=now + 30):
+            eq_(banks.get_bank(self.first.pk).name, 'First Bank')
+        with mock.patch.object(banks.time, 'monotonic', return_value=now + 61):
+            eq_(banks.get_bank(self.first.pk).name, 'Changed')
+
+    @override_settings(ALL_BANKS_LOCAL_RELOAD_SECONDS=60)
+    def test_shared_cache_relies_on_the_version(self):
+        now = banks.time.monotonic()
+        banks.all_banks()
+        AllBanks.objects.filter(pk=self.first.pk).update(name='Changed')
+        with mock.patch.object(banks, 'is_shared', return_value=True), \
+                mock.patch.object(banks.time, 'monotonic', return_value=now + 61):
+            eq_(banks.get_bank(self.first.pk).name, 'First Bank')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_dummy_cache_still_serves_the_list(self):
+        # The version always reads back as None, like the initial state.
+        eq_(banks.get_bank(self.first.pk).name, 'First Bank')
+        eq_(set(banks.get_banks_by_code(['011', '022'])), {'011', '022'})
+
+    def test_attach_banks_avoids_a_query_per_account(self):
+        user = UserFactory()
+        for bank in (self.first, self.second):
+            Bank.objects.create(owner=user, bank=bank, account_name='Owner', account_number='0000000000',
+                                account_type='savings')
+        accounts = list(Bank.objects.filter(owner=user))
+        banks.all_banks()
+        with self.assertNumQueries(0):
+            codes = sorted(account.bank.bank_code for account in banks.attach_banks(accounts))
+        eq_(codes, ['011', '022'])
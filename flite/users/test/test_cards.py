@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from nose.tools import eq_
+from ..models import ArchivedCard, Card
+from .. import cards
+from .factories import UserFactory
+
+
+class CardFixtureMixin:
+
+    def create_card(self, owner, number='4084084084084081', **fields):
+        return Card.objects.create(owner=owner, authorization_code='AUTH_x', ctype='visa', cbin='408408',
+                                   cbrand='visa', country_code='NG', first_name='Ada', last_name='Obi',
+                                   number=number, bank='Test Bank', expiry_month='12', expiry_year='2030',
+                                   **fields)
+
+
+class TestCardManagers(CardFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.live = self.create_card(self.user)
+        self.deleted = self.create_card(self.user, number='5060666666666666')
+        self.deleted.delete()
+
+    def test_delete_is_soft_and_records_when(self):
+        self.deleted.refresh_from_db()
+        eq_(self.deleted.is_deleted, True)
+        eq_(self.deleted.is_active, False)
+        self.assertIsNotNone(self.deleted.deleted_on)
+
+    def test_default_manager_hides_deleted_cards(self):
+        eq_(list(Card.objects.filter(owner=self.user)), [self.live])
+        eq_(list(self.user.card_set.all()), [self.live])
+        eq_(Card.all_objects.filter(owner=self.user).count(), 2)
+
+
+@override_settings(CARD_ARCHIVE_AFTER_DAYS=30, CARD_ARCHIVE_BATCH_SIZE=2)
+class TestCardArchival(CardFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.live = self.create_card(self.user)
+        self.old = [self.create_card(self.user, number=f'50606666666666{n:02d}') for n in range(5)]
+        for card in self.old:
+            card.delete()
+        Card.all_objects.filter(pk__in=[card.pk for card in self.old]).update(
+            deleted_on=timezone.now() - timedelta(days=31),
+        )
+        self.recent = self.create_card(self.user, number='5399999999999999')
+        self.recent.delete()
+
+    def test_long_deleted_cards_are_archived_in_batches(self):
+        # A read per batch plus the final empty one, and per batch an insert
+        # and a delete inside a savepoint.
+        with self.assertNumQueries(4 + 3 * 4):
+            eq_(cards.archive_deleted_cards(), 5)
+        eq_(set(Card.all_objects.values_list('pk', flat=True)), {self.live.pk, self.recent.pk})
+        eq_(set(ArchivedCard.objects.values_list('card_id', flat=True)), {card.pk for card in self.old})
+
+    def test_archived_card_keeps_its_details(self):
+        cards.archive_deleted_cards()
+        card = self.old[0]
+        archived = ArchivedCard.objects.get(card_id=card.pk)
+        eq_(str(archived.owner_id), str(self.user.pk))
+        eq_((archived.number, archived.authorization_code, archived.created_on),
+            (card.number, card.authorization_code, card.created_on))
+        self.assertIsNotNone(archived.deleted_on)
+
+    def test_nothing_to_archive(self):
+        eq_(cards.archive_deleted_cards(after_days=60), 0)
+        eq_(ArchivedCard.objects.count(), 0)
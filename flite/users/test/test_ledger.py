@@ -0,0 +1,152 @@
+import random
+import threading
+from decimal import Decimal
+from importlib import import_module
+from unittest import skipUnless
+from django.apps import apps
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from nose.tools import eq_
+from ..models import (AllBanks, Balance, Bank, BankTransfer, ImmutableLedgerEntry, LedgerEntry, P2PTransfer,
+                      Transaction)
+from .. import ledger
+from .factories import UserFactory
+
+
+def balance_of(user):
+    return Balance.objects.get(owner=user, active=True)
+
+
+class TestLedgerPosting(TestCase):
+
+    def setUp(self):
+        self.alice = UserFactory()
+        self.bob = UserFactory()
+        ledger.deposit(self.alice, '100.00')
+
+    def test_deposit_credits_the_balance(self):
+        balance = balance_of(self.alice)
+        eq_(balance.book_balance, Decimal('100.00'))
+        eq_(balance.available_balance, Decimal('100.00'))
+        eq_(list(LedgerEntry.objects.filter(balance=balance).values_list('amount', 'balance_after')),
+            [(Decimal('100.00'), Decimal('100.00'))])
+
+    def test_transfer_moves_money_and_writes_both_entries(self):
+        record = ledger.transfer(self.alice, self.bob, '30.50')
+        eq_(balance_of(self.alice).book_balance, Decimal('69.50'))
+        eq_(balance_of(self.bob).available_balance, Decimal('30.50'))
+        eq_(P2PTransfer.objects.get(pk=record.pk).new_balance, Decimal('69.50'))
+        amounts = sorted(LedgerEntry.objects.filter(transaction=record).values_list('amount', flat=True))
+        eq_(amounts, [Decimal('-30.50'), Decimal('30.50')])
+
+    def test_insufficient_funds_leaves_nothing_behind(self):
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.transfer(self.alice, self.bob, '100.01')
+        eq_(balance_of(self.alice).book_balance, Decimal('100.00'))
+        eq_(P2PTransfer.objects.exists(), False)
+
+    def test_invalid_amounts_are_rejected(self):
+        for amount in ('0', '-5'):
+            with self.assertRaises(ledger.LedgerError):
+                ledger.transfer(self.alice, self.bob, amount)
+        with self.assertRaises(ledger.LedgerError):
+            ledger.transfer(self.alice, self.alice, '1')
+
+    def test_withdrawal_debits_and_leaves_a_pending_transfer(self):
+        listed = AllBanks.objects.create(name='Bank', acronym='B', bank_code='001')
+        bank = Bank.objects.create(owner=self.alice, bank=listed, account_name='Alice',
+                                   account_number='0123456789', account_type='savings')
+        record = ledger.withdraw_to_bank(self.alice, bank, '40')
+        eq_(BankTransfer.objects.get(pk=record.pk).status, Transaction.STATUS_PENDING)
+        eq_(balance_of(self.alice).available_balance, Decimal('60.00'))
+
+    def test_entries_are_immutable(self):
+        entry = LedgerEntry.objects.first()
+        entry.amount = Decimal('1.00')
+        with self.assertRaises(ImmutableLedgerEntry):
+            entry.save()
+        with self.assertRaises(ImmutableLedgerEntry):
+            entry.delete()
+        with self.assertRaises(ImmutableLedgerEntry):
+            LedgerEntry.objects.update(amount=0)
+        with self.assertRaises(ImmutableLedgerEntry):
+            LedgerEntry.objects.all().delete()
+
+
+class TestOpeningEntries(TestCase):
+    """
+    Tests the opening entries migration 0010 posts for balances that
+    predate the ledger.
+    """
+
+    def post_opening_entries(self):
+        import_module('flite.users.migrations.0010_ledger_entries').post_opening_entries(apps, None)
+
+    def test_legacy_balance_gets_an_opening_entry(self):
+        user = UserFactory()
+        Balance.objects.filter(owner=user).update(book_balance=Decimal('75.50'),
+                                                  available_balance=Decimal('75.50'))
+        self.post_opening_entries()
+        balance = balance_of(user)
+        eq_(ledger.verify_balance(balance), [])
+        eq_(ledger.ledger_balance(balance, at=balance.created), Decimal('75.50'))
+        eq_(Transaction.objects.get(owner=user).reference, f'opening-{balance.pk}')
+        ledger.deposit(user, '4.50')
+        eq_(ledger.verify_balance(balance_of(user)), [])
+
+    def test_only_unposted_non_zero_balances_are_opened(self):
+        empty, posted = UserFactory(), UserFactory()
+        ledger.deposit(posted, '10.00')
+        self.post_opening_entries()
+        eq_(LedgerEntry.objects.filter(balance__owner=empty).count(), 0)
+        eq_(LedgerEntry.objects.filter(balance__owner=posted).count(), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', "needs row-level locking")
+class TestLedgerStress(TransactionTestCase):
+    """
+    Hammers a small set of balances with concurrent transfers in both
+    directions and checks that no money is created or lost.
+    """
+    threads = 8
+    transfers_per_thread = 50
+
+    def setUp(self):
+        self.users = [UserFactory() for _ in range(6)]
+        for user in self.users:
+            ledger.deposit(user, '500.00')
+        self.total = Decimal('500.00') * len(self.users)
+
+    def run_transfers(self, seed, errors):
+        rng = random.Random(seed)
+        try:
+            for _ in range(self.transfers_per_thread):
+                sender, recipient = rng.sample(self.users, 2)
+                try:
+                    ledger.transfer(sender, recipient, Decimal(rng.randint(1, 20000)) / 100)
+                except ledger.InsufficientFunds:
+                    pass
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    def test_concurrent_transfers_conserve_money(self):
+        errors = []
+        workers = [threading.Thread(target=self.run_transfers, args=(seed, errors))
+                   for seed in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        eq_(errors, [])
+        balances = Balance.objects.filter(owner__in=self.users)
+        eq_(balances.aggregate(total=Sum('book_balance'))['total'], self.total)
+        for balance in balances:
+            self.assertGreaterEqual(balance.available_balance, 0)
+            posted = LedgerEntry.objects.filter(balance=balance).aggregate(total=Sum('amount'))['total']
+            eq_(posted, balance.book_balance)
+            last = LedgerEntry.objects.filter(balance=balance).latest('id')
+            eq_(last.balance_after, balance.book_balance)
@@ -0,0 +1,117 @@
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from unittest import mock
+from django.db import IntegrityError
+from django.test import TestCase
+from nose.tools import eq_, ok_
+from flite.core.models import BudgetCategory, SpendingRollup, Transaction
+from ..models import User, UserProfile, prefetch_total_amounts
+from .factories import UserFactory
+
+
+class TestUserTotalAmount(TestCase):
+
+    def setUp(self):
+        self.users = [UserFactory() for _ in range(3)]
+        for n, user in enumerate(self.users):
+            category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000,
+                                                     owner=user)
+            for amount in range(n):
+                Transaction.objects.create(owner=user, category=category, amount=Decimal('10.25'),
+                                           description='x')
+
+    def test_total_amount_of_a_single_user(self):
+        user = User.objects.get(pk=self.users[2].pk)
+        eq_(user.total_amount, Decimal('20.50'))
+
+    def test_annotated_users_need_no_further_queries(self):
+        with self.assertNumQueries(1):
+            totals = {user.username: user.total_amount for user in User.objects.with_total_amount()}
+        eq_(totals[self.users[0].username], Decimal('0.00'))
+        eq_(totals[self.users[1].username], Decimal('10.25'))
+        eq_(totals[self.users[2].username], Decimal('20.50'))
+
+    def test_prefetch_loads_all_totals_in_one_query(self):
+        users = list(User.objects.all())
+        with self.assertNumQueries(1):
+            prefetch_total_amounts(users)
+            totals = [user.total_amount for user in users]
+        eq_(sorted(totals), [Decimal('0.00'), Decimal('10.25'), Decimal('20.50')])
+
+    def test_unprefetched_total_is_read_on_every_access(self):
+        user = User.objects.get(pk=self.users[2].pk)
+        eq_(user.total_amount, Decimal('20.50'))
+        category = BudgetCategory.objects.get(owner=user)
+        Transaction.objects.create(owner=user, category=category, amount=Decimal('1.00'), description='x')
+        eq_(user.total_amount, Decimal('21.50'))
+
+    def test_total_follows_updates_and_deletes(self):
+        transaction = Transaction.objects.filter(owner=self.users[2]).first()
+        transaction.amount = Decimal('1.00')
+        transaction.save()
+        eq_(User.objects.get(pk=self.users[2].pk).total_amount, Decimal('11.25'))
+        transaction.delete()
+        eq_(User.objects.get(pk=self.users[2].pk).total_amount, Decimal('10.25'))
+
+
+class TestCheckUserTotalsCommand(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        category = BudgetCategory.objects.create(name='Food', description='Food', max_spend=1000,
+                                                 owner=self.user)
+        Transaction.objects.create(owner=self.user, category=category, amount=Decimal('40.00'),
+                                   description='x')
+
+    def test_consistent_totals_pass(self):
+        out = StringIO()
+        call_command('check_user_totals', stdout=out)
+        eq_(out.getvalue().strip(), '0 users have drifted')
+
+    def test_drift_is_reported_and_fixed(self):
+        SpendingRollup.objects.filter(owner=self.user).update(total=Decimal('1.00'))
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_user_totals', stdout=out)
+        self.assertRegex(out.getvalue(), r'stored 1(\.00)?, actual 40(\.00)?')
+
+        call_command('check_user_totals', '--fix', stdout=StringIO())
+        eq_(User.objects.get(pk=self.user.pk).total_amount, Decimal('40.00'))
+
+
+class TestReferralCodes(TestCase):
+
+    def setUp(self):
+        self.taken = UserFactory().userprofile.referral_code
+        users = [UserFactory(username='first'), UserFactory(username='second')]
+        UserProfile.objects.filter(user__in=users).delete()
+
+    def test_collision_is_retried_with_a_new_code(self):
+        user = User.objects.get(username='first')
+        with mock.patch.object(UserProfile, 'referral_code_candidate', side_effect=[self.taken, 'fresh001']):
+            profile = UserProfile.objects.create(user=user)
+        eq_(profile.referral_code, 'fresh001')
+        eq_(UserProfile.objects.get(user=user).referral_code, 'fresh001')
+
+    def test_gives_up_after_repeated_collisions(self):
+        user = User.objects.get(username='first')
+        with mock.patch.object(UserProfile, 'referral_code_candidate', return_value=self.taken):
+            with self.assertRaises(IntegrityError):
+                UserProfile.objects.create(user=user)
+        eq_(UserProfile.objects.filter(user=user).exists(), False)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        user = User.objects.get(username='first')
+        UserProfile.objects.create(user=user)
+        with mock.patch.object(UserProfile, 'referral_code_candidate',
+                               wraps=UserProfile.referral_code_candidate) as candidate:
+            with self.assertRaises(IntegrityError):
+                UserProfile.objects.create(user=user)
+        eq_(candidate.call_count, 1)
+
+    def test_generated_codes_are_lower_case_and_unique(self):
+        codes = [UserFactory().userprofile.referral_code for _ in range(20)] + [self.taken]
+        eq_(len(set(codes)), len(codes))
+        ok_(all(code == code.lower() for code in codes))
@@ -0,0 +1,106 @@
+import threading
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from nose.tools import eq_
+from ..models import AllBanks, Balance, Bank, BankTransfer, Transaction
+from .. import ledger, payouts
+from .factories import UserFactory
+
+
+class PayoutFixtureMixin:
+
+    def create_transfers(self, count_per_bank):
+        self.banks = [AllBanks.objects.create(name=f'Bank {code}', acronym=code, bank_code=code)
+                      for code in ('001', '002')]
+        self.user = UserFactory()
+        ledger.deposit(self.user, '10000.00')
+        transfers = []
+        for bank in self.banks:
+            account = Bank.objects.create(owner=self.user, bank=bank, account_name='Owner',
+                                          account_number=f'{bank.bank_code}0000000', account_type='savings')
+            for _ in range(count_per_bank):
+                transfers.append(ledger.withdraw_to_bank(self.user, account, '10.00'))
+        return transfers
+
+
+@override_settings(PAYOUT_GATEWAY='flite.users.payouts.LocmemPayoutGateway', PAYOUT_BATCH_SIZE=2)
+class TestPayoutProcessing(PayoutFixtureMixin, TestCase):
+
+    def setUp(self):
+        payouts.outbox.clear()
+        self.transfers = self.create_transfers(3)
+
+    def statuses(self):
+        return Counter(BankTransfer.objects.values_list('status', flat=True))
+
+    def test_transfers_are_sent_in_batches_per_bank(self):
+        eq_(payouts.process_payouts(limit=4), 6)
+        eq_([(bank_code, len(batch)) for bank_code, batch in payouts.outbox],
+            [('001', 2), ('001', 1), ('002', 1), ('002', 2)])
+        eq_(self.statuses(), {Transaction.STATUS_SUCCESS: 6})
+        eq_(payouts.process_payouts(), 0)
+
+    def test_claims_do_not_overlap(self):
+        first = payouts.claim_payouts(4)
+        second = payouts.claim_payouts(4)
+        eq_(len(first), 4)
+        eq_(len(second), 2)
+        eq_(set(first) & set(second), set())
+        eq_(payouts.claim_payouts(4), [])
+
+    def test_rejected_payouts_are_refunded(self):
+        rejected = {self.transfers[0].reference}
+
+        def send_batch(bank_code, batch):
+            return rejected & {payout['reference'] for payout in batch}
+
+        with mock.patch.object(payouts.LocmemPayoutGateway, 'send_batch', side_effect=send_batch):
+            payouts.process_payouts()
+        eq_(self.statuses(), {Transaction.STATUS_SUCCESS: 5, Transaction.STATUS_FAILED: 1})
+        eq_(Balance.objects.get(owner=self.user).book_balance, Decimal('9950.00'))
+        eq_(ledger.refund_bank_transfers([self.transfers[0].pk]), 0)
+        eq_(ledger.verify_balance(Balance.objects.get(owner=self.user)), [])
+
+    def test_unknown_outcomes_are_requeued_once_stale(self):
+        with mock.patch.object(payouts.LocmemPayoutGateway, 'send_batch',
+                               side_effect=payouts.PayoutGatewayError):
+            payouts.process_payouts()
+        eq_(self.statuses(), {Transaction.STATUS_PROCESSING: 6})
+        eq_(payouts.requeue_stale_payouts(), 0)
+
+        later = timezone.now() + timedelta(seconds=3600)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            eq_(payouts.requeue_stale_payouts(), 6)
+        payouts.process_payouts()
+        eq_(self.statuses(), {Transaction.STATUS_SUCCESS: 6})
+
+
+@skipUnless(connection.vendor == 'postgresql', "needs SELECT ... FOR UPDATE SKIP LOCKED")
+@override_settings(PAYOUT_GATEWAY='flite.users.payouts.LocmemPayoutGateway', PAYOUT_BATCH_SIZE=5)
+class TestParallelPayoutWorkers(PayoutFixtureMixin, TransactionTestCase):
+
+    def test_parallel_workers_pay_each_transfer_once(self):
+        payouts.outbox.clear()
+        transfers = self.create_transfers(50)
+
+        def work():
+            try:
+                payouts.process_payouts(limit=7)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=work) for _ in range(6)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        sent = Counter(payout['reference'] for _, batch in payouts.outbox for payout in batch)
+        eq_(set(sent), {transfer.reference for transfer in transfers})
+        eq_(max(sent.values()), 1)
+        eq_(set(BankTransfer.objects.values_list('status', flat=True)), {Transaction.STATUS_SUCCESS})
@@ -0,0 +1,74 @@
+import itertools
+from unittest import mock
+from django.core.cache import cache
+from django.forms.models import model_to_dict
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from flite.core.test.mixins import QueryCountMixin
+from ..models import NewUserPhoneVerification
+from .. import tasks, verification
+from .factories import UserFactory
+
+
+class TestUsersQueryCounts(QueryCountMixin, APITestCase):
+    """
+    The users and phone endpoints must run the same number of queries
+    however many users and verifications exist.
+    """
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(tasks.flush_sms_queue, 'apply_async')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = UserFactory()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.auth_token}')
+        # Fresh numbers and emails, so the per-number and per-email throttles never trip.
+        self.sequence = itertools.count()
+
+    def seed_users(self, count):
+        for _ in range(count):
+            UserFactory()
+
+    def seed_verifications(self, count):
+        NewUserPhoneVerification.objects.bulk_create([
+            NewUserPhoneVerification(phone_number=f'+23481{next(self.sequence):08d}',
+                                     verification_code='123456', email='seeded@example.com')
+            for _ in range(count)
+        ])
+
+    def test_user_detail(self):
+        url = reverse('user-detail', kwargs={'pk': self.user.pk})
+        self.assertConstantQueries('GET user-detail', self.seed_users, lambda: self.client.get(url))
+
+    def test_user_update(self):
+        url = reverse('user-detail', kwargs={'pk': self.user.pk})
+        self.assertConstantQueries('PUT user-detail', self.seed_users,
+                                   lambda: self.client.put(url, {'first_name': 'Ada'}))
+
+    def test_signup(self):
+        def request():
+            data = model_to_dict(UserFactory.build(username=f'signup{next(self.sequence)}'))
+            data['email'] = f'signup{next(self.sequence)}@example.com'
+            return self.client.post(reverse('user-list'), data)
+
+        self.assertConstantQueries('POST user-list', self.seed_users, request)
+
+    def test_phone_verification_send(self):
+        def request():
+            n = next(self.sequence)
+            return self.client.post(reverse('newuserphoneverification-list'),
+                                    {'phone_number': f'+23480{n:08d}', 'email': f'phone{n}@example.com'})
+
+        self.assertConstantQueries('POST newuserphoneverification-list', self.seed_verifications, request)
+
+    def test_phone_verification_check(self):
+        pending = [verification.get_backend().send(f'+23480{n:08d}', f'phone{n}@example.com')
+                   for n in range(len(self.seed_sizes) + 1)]
+
+        def request():
+            verification_id, code = pending.pop()
+            url = reverse('newuserphoneverification-detail', kwargs={'pk': verification_id})
+            return self.client.put(url, {'code': code})
+
+        self.assertConstantQueries('PUT newuserphoneverification-detail', self.seed_verifications, request)
@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from flite.core.test.mixins import QueryPlanMixin
+from ..models import Card, User, UserProfile, NewUserPhoneVerification
+from .factories import UserFactory
+
+
+class TestUsersQueryPlans(QueryPlanMixin, TestCase):
+    """
+    The lookups behind the users endpoints must be served by an index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [UserFactory() for _ in range(30)]
+        NewUserPhoneVerification.objects.bulk_create([
+            NewUserPhoneVerification(phone_number=f'+23480{n:08d}', verification_code=f'{n:06d}',
+                                     email='a@b.com')
+            for n in range(30)
+        ])
+        cls.user = cls.users[0]
+
+        Card.objects.bulk_create([
+            Card(owner=user, authorization_code='AUTH_x', ctype='visa', cbin='408408', cbrand='visa',
+                 country_code='NG', first_name='Ada', last_name='Obi', number=f'40840840840{n:05d}',
+                 bank='Test Bank', expiry_month='12', expiry_year='2030', is_deleted=n % 2 == 0,
+                 deleted_on=timezone.now() if n % 2 == 0 else None)
+            for n, user in enumerate(cls.users)
+        ])
+
+    def setUp(self):
+        self.analyze(User, UserProfile, Token, NewUserPhoneVerification, Card)
+
+    def test_user_detail(self):
+        self.assertNoSequentialScan(User.objects.filter(pk=self.user.pk))
+
+    def test_token_authentication(self):
+        queryset = Token.objects.select_related('user').filter(key=self.user.auth_token.key)
+        self.assertNoSequentialScan(queryset, Token, User)
+
+    def test_referral_code_lookup(self):
+        code = self.user.userprofile.referral_code
+        self.assertNoSequentialScan(UserProfile.objects.filter(referral_code=code.lower()))
+
+    def test_phone_verification_lookup(self):
+        queryset = NewUserPhoneVerification.objects.filter(phone_number='+2348000000007',
+                                                           verification_code='000007')
+        self.assertNoSequentialScan(queryset)
+
+    def test_active_cards_of_owner(self):
+        self.assertNoSequentialScan(Card.objects.filter(owner=self.user))
+
+    def test_long_deleted_cards(self):
+        self.assertNoSequentialScan(Card.all_objects.filter(is_deleted=True, deleted_on__lt=timezone.now()))
@@ -0,0 +1,65 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from nose.tools import eq_, ok_
+from rest_framework.authtoken.models import Token
+from ..models import User, UserProfile, Referral, Balance
+from ..services import provision_user, bulk_provision_users
+from .factories import UserFactory
+
+
+class TestProvisionUser(TestCase):
+
+    def test_creates_the_user_and_dependent_rows(self):
+        user = provision_user(username='newuser', email='new@example.com', password='secret123')
+        ok_(user.check_password('secret123'))
+        ok_(Token.objects.filter(user=user).exists())
+        ok_(UserProfile.objects.filter(user=user).exists())
+        eq_(Balance.objects.filter(owner=user).count(), 1)
+        eq_(Referral.objects.filter(referred=user).exists(), False)
+
+    def test_records_the_referral(self):
+        referrer = UserFactory()
+        user = provision_user(referrer=referrer, username='newuser', password='secret123')
+        ok_(Referral.objects.filter(owner=referrer, referred=user).exists())
+
+    def test_failure_leaves_no_partial_rows(self):
+        referrer = UserFactory()
+        provision_user(referrer=referrer, username='first', password='secret123')
+        # The referrer can only own one referral, so the second insert fails.
+        with self.assertRaises(Exception):
+            provision_user(referrer=referrer, username='second', password='secret123')
+        eq_(User.objects.filter(username='second').exists(), False)
+        eq_(UserProfile.objects.filter(user__username='second').exists(), False)
+
+
+class TestBulkProvisionUsers(TestCase):
+
+    def test_creates_users_with_dependent_rows(self):
+        rows = [{'username': f'cohort{n}', 'email': f'cohort{n}@EXAMPLE.com'} for n in range(25)]
+        rows[0]['password'] = 'secret123'
+        users = bulk_provision_users(rows, batch_size=10)
+
+        eq_(User.objects.filter(username__startswith='cohort').count(), 25)
+        eq_(Token.objects.filter(user__in=users).count(), 25)
+        eq_(Balance.objects.filter(owner__in=users).count(), 25)
+        codes = UserProfile.objects.filter(user__in=users).values_list('referral_code', flat=True)
+        eq_(len(set(codes)), 25)
+        ok_(User.objects.get(username='cohort0').check_password('secret123'))
+        eq_(User.objects.get(username='cohort1').has_usable_password(), False)
+        eq_(User.objects.get(username='cohort1').email, 'cohort1@example.com')
+
+    def test_query_count_does_not_grow_per_user(self):
+        # The referral code probe, one INSERT per table, and the savepoint pair.
+        with self.assertNumQueries(7):
+            bulk_provision_users([{'username': f'cohort{n}'} for n in range(50)], batch_size=100)
+
+
+class TestBenchmarkSignupCommand(TestCase):
+
+    def test_reports_both_paths_and_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_signup', '--count', '3', stdout=out)
+        self.assertIn('provision_user: 3 users', out.getvalue())
+        self.assertIn('bulk_provision_users: 3 users', out.getvalue())
+        eq_(User.objects.filter(username__startswith='bench-').exists(), False)
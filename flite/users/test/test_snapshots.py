@@ -0,0 +1,85 @@
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from nose.tools import eq_
+from ..models import Balance, BalanceSnapshot, LedgerEntry
+from .. import ledger
+from .factories import UserFactory
+
+
+class TestBalanceSnapshots(TestCase):
+
+    def setUp(self):
+        self.alice = UserFactory()
+        self.bob = UserFactory()
+        self.balance = Balance.objects.get(owner=self.alice)
+        self.start = timezone.now() - timedelta(days=10)
+
+    def post_on(self, day, amount):
+        with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(days=day)):
+            ledger.deposit(self.alice, amount)
+
+    def test_snapshot_adds_new_entries_to_the_previous_one(self):
+        self.post_on(0, '10.00')
+        self.post_on(1, '5.00')
+        eq_(ledger.take_snapshots(min_entries=1), 1)
+        self.post_on(2, '2.50')
+        ledger.deposit(self.bob, '1.00')
+        eq_(ledger.take_snapshots(min_entries=1), 2)
+        eq_(ledger.take_snapshots(min_entries=1), 0)
+
+        snapshot = ledger.latest_snapshot(self.balance.pk)
+        eq_(snapshot.book_balance, Decimal('17.50'))
+        eq_(snapshot.last_entry_id, LedgerEntry.objects.filter(balance=self.balance).latest('id').pk)
+
+    def test_balance_reads_only_the_entries_after_the_snapshot(self):
+        for day in range(5):
+            self.post_on(day, '1.00')
+        ledger.take_snapshots(min_entries=1)
+        self.post_on(6, '3.00')
+        with self.assertNumQueries(2):
+            eq_(ledger.ledger_balance(self.balance), Decimal('8.00'))
+
+    def test_point_in_time_balance(self):
+        self.post_on(0, '10.00')
+        self.post_on(2, '5.00')
+        ledger.take_snapshots(min_entries=1)
+        self.post_on(4, '1.00')
+        eq_(ledger.ledger_balance(self.balance, at=self.start + timedelta(days=1)), Decimal('10.00'))
+        eq_(ledger.ledger_balance(self.balance, at=self.start + timedelta(days=3)), Decimal('15.00'))
+        eq_(ledger.ledger_balance(self.balance, at=self.start + timedelta(days=5)), Decimal('16.00'))
+        eq_(ledger.ledger_balance(self.balance, at=self.start - timedelta(days=1)), Decimal('0.00'))
+
+    def test_balances_below_the_threshold_wait(self):
+        self.post_on(0, '10.00')
+        eq_(ledger.take_snapshots(min_entries=2), 0)
+        self.post_on(1, '10.00')
+        eq_(ledger.take_snapshots(min_entries=2), 1)
+
+
+class TestVerifyBalanceSnapshotsCommand(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        ledger.deposit(self.user, '10.00')
+        ledger.deposit(self.user, '5.00')
+        ledger.take_snapshots(min_entries=1)
+
+    def test_consistent_ledger_passes(self):
+        out = StringIO()
+        call_command('verify_balance_snapshots', stdout=out)
+        eq_(out.getvalue().strip(), '0 balances disagree with their ledger')
+
+    def test_tampered_snapshot_is_reported(self):
+        BalanceSnapshot.objects.update(book_balance=Decimal('99.00'))
+        Balance.objects.filter(owner=self.user).update(book_balance=Decimal('1.00'))
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('verify_balance_snapshots', stdout=out)
+        self.assertIn('stored 99.00, replayed 15.00', out.getvalue())
+        self.assertIn('book balance 1.00, replayed 15.00', out.getvalue())
@@ -0,0 +1,148 @@
+import json
+from unittest import mock
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from kombu.exceptions import OperationalError
+from nose.tools import eq_, ok_
+from .. import sms, tasks, throttling
+
+
+@override_settings(SMS_GATEWAY='flite.users.sms.LocmemSMSGateway', SMS_BATCH_SIZE=100)
+class TestSMSPipeline(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        sms.outbox.clear()
+        patcher = mock.patch.object(tasks.flush_sms_queue, 'apply_async')
+        self.schedule_flush = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(tasks.send_sms_batch, 'delay', side_effect=tasks.send_sms_batch)
+        self.send_batch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue_sms(self, phone_number, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.queue_sms(phone_number, body)
+
+    def test_burst_is_flushed_in_batches(self):
+        for n in range(250):
+            self.queue_sms(f'+234801{n:07d}', f'message {n}')
+        eq_(self.schedule_flush.call_count, 1)
+
+        tasks.flush_sms_queue()
+        eq_(self.send_batch.call_count, 3)
+        eq_(len(sms.outbox), 250)
+        eq_(sms.outbox[0], ('+2348010000000', 'message 0'))
+        eq_(sms.outbox[-1], ('+2348010000249', 'message 249'))
+
+    def test_messages_after_a_flush_schedule_the_next_one(self):
+        self.queue_sms('+2348010000000', 'first')
+        tasks.flush_sms_queue()
+        self.queue_sms('+2348010000001', 'second')
+        eq_(self.schedule_flush.call_count, 2)
+        tasks.flush_sms_queue()
+        eq_([body for _, body in sms.outbox], ['first', 'second'])
+
+    def test_unfilled_slot_is_abandoned_and_its_producer_moves_on(self):
+        cache.add(sms.SEQUENCE_KEY, 0, timeout=None)
+        cache.incr(sms.SEQUENCE_KEY)
+        eq_(sms.drain(), [])
+        # The slot was taken over by the flush, so the message goes to the next one.
+        with mock.patch.object(cache, 'incr', side_effect=[1, 2]):
+            eq_(sms.enqueue('+2348010000000', 'late'), 2)
+        cache.set(sms.SEQUENCE_KEY, 2, timeout=None)
+        eq_(sms.drain(), [('+2348010000000', 'late')])
+
+    def test_concurrent_flush_is_retried_later(self):
+        self.queue_sms('+2348010000000', 'waiting')
+        cache.add(sms.FLUSH_LOCK_KEY, True)
+        tasks.flush_sms_queue()
+        eq_(sms.outbox, [])
+        eq_(self.schedule_flush.call_count, 2)
+
+    def test_flush_is_scheduled_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            tasks.queue_sms('+2348010000000', 'waiting')
+        eq_(self.schedule_flush.call_count, 0)
+        eq_(len(callbacks), 1)
+
+    def test_broker_outage_leaves_the_message_queued(self):
+        self.schedule_flush.side_effect = OperationalError('broker down')
+        with mock.patch.object(tasks.logger, 'exception'):
+            self.queue_sms('+2348010000000', 'first')
+        self.schedule_flush.side_effect = None
+        # The next message schedules the flush again.
+        self.queue_sms('+2348010000001', 'second')
+        eq_(self.schedule_flush.call_count, 2)
+        tasks.flush_sms_queue()
+        eq_([body for _, body in sms.outbox], ['first', 'second'])
+
+    @override_settings(SMS_GATEWAY_RATE_LIMIT='2/s')
+    def test_batches_share_the_gateway_rate_limit(self):
+        # Each task run gets its own throttle, as separate workers would.
+        with mock.patch.object(tasks.send_sms_batch, 'apply_async') as requeue:
+            for n in range(3):
+                tasks.send_sms_batch([('+2348010000000', f'message {n}')])
+        eq_([body for _, body in sms.outbox], ['message 0', 'message 1'])
+        eq_(requeue.call_count, 1)
+        eq_(requeue.call_args[0][0], ([('+2348010000000', 'message 2')],))
+        ok_(requeue.call_args[1]['countdown'] > 0)
+
+    def test_each_gateway_has_its_own_bucket(self):
+        with override_settings(SMS_GATEWAY='flite.users.sms.HTTPSMSGateway'):
+            http_key = throttling.SMSGatewayThrottle().key
+        ok_(http_key != throttling.SMSGatewayThrottle().key)
+
+    def test_verification_code_is_sent(self):
+        tasks.send_sms_verification_code('+2348010000000', '123456')
+        tasks.flush_sms_queue()
+        eq_(sms.outbox, [('+2348010000000', 'Your Flite verification code is 123456')])
+
+
+@override_settings(SMS_GATEWAY='flite.users.sms.HTTPSMSGateway',
+                   SMS_GATEWAY_URL='https://sms.example.com/batch', SMS_GATEWAY_API_KEY='key')
+class TestHTTPSMSGateway(TestCase):
+
+    def setUp(self):
+        sms.reset_gateways()
+        self.addCleanup(sms.reset_gateways)
+
+    def test_gateway_is_reused_within_a_process(self):
+        ok_(sms.get_gateway() is sms.get_gateway())
+
+    def test_batch_is_sent_in_one_request(self):
+        gateway = sms.get_gateway()
+        with mock.patch.object(gateway.http, 'request', return_value=mock.Mock(status=200)) as request:
+            gateway.send_batch([('+2348010000000', 'a'), ('+2348010000001', 'b')])
+        eq_(request.call_count, 1)
+        method, url = request.call_args[0]
+        eq_((method, url), ('POST', 'https://sms.example.com/batch'))
+        eq_(json.loads(request.call_args[1]['body']),
+            {'messages': [{'to': '+2348010000000', 'body': 'a'}, {'to': '+2348010000001', 'body': 'b'}]})
+
+    def test_error_response_raises(self):
+        gateway = sms.get_gateway()
+        with mock.patch.object(gateway.http, 'request', return_value=mock.Mock(status=503)):
+            with self.assertRaises(sms.SMSGatewayError):
+                gateway.send_batch([('+2348010000000', 'a')])
+
+
+class TestSMSConfiguration(TestCase):
+
+    @override_settings(SMS_GATEWAY='flite.users.sms.HTTPSMSGateway',
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_real_gateway_requires_a_shared_cache(self):
+        with self.assertRaisesRegex(ImproperlyConfigured, 'The SMS queue needs a cache shared'):
+            sms.check_configuration()
+
+    @override_settings(SMS_GATEWAY='flite.users.sms.HTTPSMSGateway',
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+                                           'LOCATION': 'memcached:11211'}})
+    def test_real_gateway_with_a_shared_cache(self):
+        sms.check_configuration()
+
+    @override_settings(SMS_GATEWAY='flite.users.sms.LocmemSMSGateway',
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_stub_gateway_works_with_a_local_cache(self):
+        sms.check_configuration()
@@ -0,0 +1,72 @@
+from unittest import mock
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from nose.tools import eq_
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from ..throttling import IPThrottle, SignupEmailThrottle, check_configuration
+
+
+class BucketThrottle(IPThrottle):
+    scope = 'test'
+    rate = '3/min'
+
+
+class TestTokenBucketThrottle(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.request = APIRequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+
+    def allow(self):
+        throttle = BucketThrottle()
+        with mock.patch.object(BucketThrottle, 'timer', side_effect=lambda: self.now):
+            return throttle.allow_request(self.request, None), throttle
+
+    def test_allows_a_burst_up_to_capacity(self):
+        eq_([self.allow()[0] for _ in range(4)], [True, True, True, False])
+
+    def test_refills_at_the_configured_rate(self):
+        for _ in range(3):
+            self.allow()
+        allowed, throttle = self.allow()
+        eq_(allowed, False)
+        eq_(round(throttle.wait()), 20)
+        self.now += 20
+        eq_(self.allow()[0], True)
+        eq_(self.allow()[0], False)
+
+    def test_state_is_shared_between_instances(self):
+        # Each request gets a fresh throttle instance, as each gunicorn worker would.
+        for _ in range(3):
+            self.allow()
+        eq_(self.allow()[0], False)
+
+    def test_refused_while_the_bucket_is_locked(self):
+        cache.add(f"{BucketThrottle().get_cache_key(self.request, None)}:lock", True)
+        with mock.patch.object(BucketThrottle, 'lock_wait', 0):
+            eq_(self.allow()[0], False)
+
+
+class TestRequestFieldThrottle(TestCase):
+
+    def test_body_that_is_not_an_object_has_no_key(self):
+        request = Request(APIRequestFactory().post('/', [1, 2], format='json'), parsers=[JSONParser()])
+        eq_(SignupEmailThrottle().get_cache_key(request, None), None)
+
+
+class TestCheckConfiguration(TestCase):
+
+    @override_settings(REQUIRE_SHARED_CACHE=True,
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_required_shared_cache_rejects_locmem(self):
+        with self.assertRaisesRegex(ImproperlyConfigured, 'Throttling needs a cache shared'):
+            check_configuration()
+
+    @override_settings(REQUIRE_SHARED_CACHE=False,
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_locmem_is_allowed_unless_required(self):
+        check_configuration()
@@ -0,0 +1,39 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from nose.tools import eq_, ok_
+from .. import tasks
+from ..verification import CacheVerificationBackend, VerificationError, VerificationNotFound
+
+
+@override_settings(PHONE_VERIFICATION_MAX_ATTEMPTS=3, PHONE_VERIFICATION_TTL_SECONDS=60)
+class TestCacheVerificationBackend(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(tasks.flush_sms_queue, 'apply_async')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = CacheVerificationBackend()
+        self.verification_id, self.code = self.backend.send('+2348012345678', 'new@example.com')
+
+    def test_only_a_hash_of_the_code_is_stored(self):
+        entry = cache.get(self.backend.entry_key(self.verification_id))
+        ok_(self.code not in str(entry))
+
+    def test_locks_after_too_many_attempts(self):
+        for _ in range(3):
+            with self.assertRaises(VerificationError):
+                self.backend.verify(self.verification_id, 'wrong')
+        with self.assertRaisesRegex(VerificationError, 'Too many attempts'):
+            self.backend.verify(self.verification_id, self.code)
+
+    def test_entries_are_written_with_the_ttl(self):
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            self.backend.send('+2348012345679', 'other@example.com')
+        eq_(set_many.call_args[0][1], 60)
+
+    def test_expired_verification_is_not_found(self):
+        cache.delete(self.backend.entry_key(self.verification_id))
+        with self.assertRaises(VerificationNotFound):
+            self.backend.verify(self.verification_id, self.code)
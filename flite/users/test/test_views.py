@@ -1,3 +1,6 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from django.forms.models import model_to_dict
 from django.contrib.auth.hashers import check_password
@@ -5,7 +8,9 @@ from nose.tools import ok_, eq_
 from rest_framework.test import APITestCase
 from rest_framework import status
 from faker import Faker
-from ..models import User,UserProfile,Referral
+from ..models import User, UserProfile, Referral, NewUserPhoneVerification
+from .. import tasks
+from ..throttling import SignupEmailThrottle
 from .factories import UserFactory
 
 fake = Faker()
@@ -17,6 +22,7 @@ class TestUserListTestCase(APITestCase):
     """
 
     def setUp(self):
+        cache.clear()
         self.url = reverse('user-list')
         self.user_data = model_to_dict(UserFactory.build())
 
@@ -78,3 +84,113 @@ class TestUserDetailTestCase(APITestCase):
         eq_(user.first_name, new_first_name)
 
 
+class TestPhoneVerificationTestCase(APITestCase):
+    """
+    Tests /phone send and verify operations with the database backend.
+    """
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(tasks.flush_sms_queue, 'apply_async')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse('newuserphoneverification-list')
+        self.payload = {'phone_number': '+2348012345678', 'email': 'new@example.com'}
+
+    def send(self):
+        # The code is only ever sent by SMS, so read it from there.
+        with mock.patch.object(tasks, 'send_sms_verification_code',
+                               wraps=tasks.send_sms_verification_code) as send_code:
+            response = self.client.post(self.url, self.payload)
+        eq_(response.status_code, status.HTTP_201_CREATED)
+        eq_(set(response.data), {'id'})
+        return response.data['id'], send_code.call_args[0][1]
+
+    def verify(self, verification_id, code):
+        url = reverse('newuserphoneverification-detail', kwargs={'pk': verification_id})
+        return self.client.put(url, {'code': code})
+
+    def test_correct_code_is_verified_once(self):
+        verification_id, code = self.send()
+        response = self.verify(verification_id, code)
+        eq_(response.status_code, status.HTTP_200_OK)
+        eq_(response.data['verification_code_status'], '1')
+        response = self.verify(verification_id, code)
+        eq_(response.data['verification_code_status'], '0')
+
+    def test_incorrect_code_is_rejected(self):
+        verification_id, code = self.send()
+        response = self.verify(verification_id, 'x' + code)
+        eq_(response.status_code, status.HTTP_400_BAD_REQUEST)
+        eq_(response.data['message'], 'Verification code is incorrect')
+
+    def test_missing_code_is_rejected(self):
+        verification_id, _ = self.send()
+        url = reverse('newuserphoneverification-detail', kwargs={'pk': verification_id})
+        eq_(self.client.put(url, {}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_verification_is_not_found(self):
+        eq_(self.verify('0123456789abcdef0123456789abcdef', '123456').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_resend_replaces_the_code(self):
+        first_id, first_code = self.send()
+        second_id, second_code = self.send()
+        response = self.verify(second_id, second_code)
+        eq_(response.status_code, status.HTTP_200_OK)
+        eq_(response.data['verification_code_status'], '1')
+
+
+@override_settings(PHONE_VERIFICATION_BACKEND='flite.users.verification.CacheVerificationBackend')
+class TestCachePhoneVerificationTestCase(TestPhoneVerificationTestCase):
+    """
+    Tests /phone send and verify operations with the cache backend.
+    """
+
+    def test_codes_are_not_written_to_the_database(self):
+        self.send()
+        eq_(NewUserPhoneVerification.objects.exists(), False)
+
+    def test_resend_replaces_the_code(self):
+        first_id, first_code = self.send()
+        super().test_resend_replaces_the_code()
+        eq_(self.verify(first_id, first_code).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestSignupThrottlingTestCase(APITestCase):
+    """
+    Tests throttling of the anonymous signup and verification endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(tasks.flush_sms_queue, 'apply_async')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_signup_is_throttled_per_email_before_any_work(self):
+        url = reverse('user-list')
+        with mock.patch.object(SignupEmailThrottle, 'rate', '2/hour', create=True):
+            for n in range(2):
+                data = model_to_dict(UserFactory.build())
+                data['email'] = 'Bot@Example.com'
+                eq_(self.client.post(url, data).status_code, status.HTTP_201_CREATED)
+            data = model_to_dict(UserFactory.build())
+            data['email'] = ' bot@example.com'
+            with self.assertNumQueries(0):
+                response = self.client.post(url, data)
+        eq_(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        ok_(int(response['Retry-After']) > 0)
+        eq_(User.objects.filter(username=data['username']).exists(), False)
+
+    def test_signup_with_a_json_array_is_rejected(self):
+        response = self.client.post(reverse('user-list'), [1, 2], format='json')
+        eq_(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_verification_is_throttled_per_phone_number(self):
+        url = reverse('newuserphoneverification-list')
+        payload = {'phone_number': '+2348012345678', 'email': 'new@example.com'}
+        statuses = [self.client.post(url, payload).status_code for _ in range(4)]
+        eq_(statuses, [status.HTTP_201_CREATED] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS])
+        # Other numbers from the same address are still served.
+        payload['phone_number'] = '+2348012345679'
+        eq_(self.client.post(url, payload).status_code, status.HTTP_201_CREATED)
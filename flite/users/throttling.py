@@ -0,0 +1,136 @@
+import hashlib
+import math
+import time
+from collections.abc import Mapping
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+from flite.core.cache import require_shared_cache
+
+
+def check_configuration():
+    if settings.REQUIRE_SHARED_CACHE:
+        require_shared_cache('Throttling')
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket kept in the cache, so every gunicorn worker draws from the
+    same bucket. That takes a shared cache: with the default locmem backend
+    each worker keeps its own bucket and a client gets n requests per worker.
+    Production refuses to start without one (REQUIRE_SHARED_CACHE). A rate
+    of 'n/period' allows bursts of n requests and refills at n per period.
+
+    Each check reads and writes the bucket under a short lock taken with
+    cache.add, which is atomic on shared backends. A request that cannot get
+    the lock is refused, since that only happens while the same client is
+    already bursting.
+    """
+    lock_attempts = 5
+    lock_wait = 0.005
+
+    def hash_ident(self, value):
+        # Keeps phone numbers and emails out of cache keys, and the keys safe
+        # for memcached.
+        return hashlib.sha256(''.join(value.split()).lower().encode()).hexdigest()
+
+    def acquire(self, lock_key):
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock_key, True, timeout=1):
+                return True
+            time.sleep(self.lock_wait)
+        return False
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.take()
+
+    def take(self):
+        """
+        Takes a token from the bucket at ``self.key``, returning False when
+        it is empty or locked.
+        """
+        self.refill_rate = self.num_requests / self.duration
+        self.tokens = 0
+        lock_key = f'{self.key}:lock'
+        if not self.acquire(lock_key):
+            return False
+        try:
+            self.now = self.timer()
+            tokens, updated = self.cache.get(self.key, (self.num_requests, self.now))
+            self.tokens = min(self.num_requests, tokens + (self.now - updated) * self.refill_rate)
+            if self.tokens < 1:
+                return False
+            # Untouched for a whole period, the bucket is full again anyway.
+            self.cache.set(self.key, (self.tokens - 1, self.now), math.ceil(self.duration))
+            return True
+        finally:
+            self.cache.delete(lock_key)
+
+    def wait(self):
+        return max((1 - self.tokens) / self.refill_rate, 0)
+
+
+class IPThrottle(TokenBucketThrottle):
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class RequestFieldThrottle(TokenBucketThrottle):
+    """
+    Throttles on the value of ``field`` in the request body; requests
+    without it are left to the other throttles.
+    """
+    field = None
+
+    def get_cache_key(self, request, view):
+        # A body that is not an object, e.g. a JSON array, is left for the
+        # serializer to reject.
+        if not isinstance(request.data, Mapping):
+            return None
+        value = request.data.get(self.field)
+        if not value:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.hash_ident(str(value))}
+
+
+class SMSGatewayThrottle(TokenBucketThrottle):
+    """
+    Limits batch requests to the SMS provider to SMS_GATEWAY_RATE_LIMIT
+    across every worker, with one bucket per SMS_GATEWAY.
+    """
+    scope = 'sms_gateway'
+
+    def __init__(self):
+        super().__init__()
+        self.key = self.cache_format % {'scope': self.scope, 'ident': self.hash_ident(settings.SMS_GATEWAY)}
+
+    def get_rate(self):
+        return settings.SMS_GATEWAY_RATE_LIMIT
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class SignupEmailThrottle(RequestFieldThrottle):
+    scope = 'signup_email'
+    field = 'email'
+
+
+class PhoneVerificationIPThrottle(IPThrottle):
+    scope = 'phone_verification_ip'
+
+
+class PhoneVerificationNumberThrottle(RequestFieldThrottle):
+    scope = 'phone_verification_number'
+    field = 'phone_number'
+
+
+class PhoneVerificationEmailThrottle(RequestFieldThrottle):
+    scope = 'phone_verification_email'
+    field = 'email'
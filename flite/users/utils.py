@@ -1,16 +1,13 @@
-import uuid
-from flite.users import models
+import secrets
+from flite.users import models, tasks
 
 def generate_new_user_passcode():
     """
-    Returns a unique passcode
+    Returns a random six digit passcode
     """
-    def _passcode():
-        return str(uuid.uuid4().int)[0:6]
-    passcode = _passcode()
-    while models.NewUserPhoneVerification.objects.filter(referral_code=passcode).exists():
-        passcode = _passcode()
-    return passcode
+    # Codes are looked up together with the phone number, so they only
+    # need to be unpredictable, not unique.
+    return f'{secrets.randbelow(10 ** 6):06d}'
 
 
 def send_mobile_signup_sms(phone_number, email):
@@ -32,7 +29,7 @@ def send_mobile_signup_sms(phone_number, email):
         attempted_verification_obj = models.NewUserPhoneVerification(phone_number=str(phone_number), verification_code=user_passcode,
             is_verified=False, email=email)
         attempted_verification_obj.save()    
-    #tasks.send_sms_verification_code.delay(phone_number, user_passcode)
+    tasks.send_sms_verification_code(phone_number, user_passcode)
     status = True
     return attempted_verification_obj, user_passcode
 
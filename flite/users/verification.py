@@ -0,0 +1,121 @@
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.module_loading import import_string
+from . import models, tasks, utils
+
+
+class VerificationError(Exception):
+    """
+    Raised when a code cannot be checked; the message is safe to show.
+    """
+
+
+class VerificationNotFound(VerificationError):
+    pass
+
+
+def get_backend():
+    """
+    Returns an instance of the backend named by PHONE_VERIFICATION_BACKEND.
+    """
+    return import_string(settings.PHONE_VERIFICATION_BACKEND)()
+
+
+class DatabaseVerificationBackend:
+    """
+    Keeps one NewUserPhoneVerification row per phone number.
+    """
+
+    def send(self, phone_number, email):
+        """
+        Issues a code for the phone number and returns (verification id, code).
+        """
+        obj, code = utils.send_mobile_signup_sms(phone_number, email)
+        return obj.id, code
+
+    def verify(self, verification_id, code):
+        """
+        Checks a code against the verification it was issued for and returns
+        (status, message) as validate_mobile_signup_sms does.
+        """
+        try:
+            obj = models.NewUserPhoneVerification.objects.get(pk=verification_id)
+        except (models.NewUserPhoneVerification.DoesNotExist, ValidationError, ValueError):
+            raise VerificationNotFound("Verification not found")
+        if obj.verification_code != code:
+            raise VerificationError("Verification code is incorrect")
+        return utils.validate_mobile_signup_sms(obj.phone_number, code)
+
+
+class CacheVerificationBackend:
+    """
+    Keeps codes in the default cache instead of the database. Only a hash
+    of each code is stored, entries expire after PHONE_VERIFICATION_TTL_SECONDS
+    and a verification is locked after PHONE_VERIFICATION_MAX_ATTEMPTS wrong
+    codes. Needs a cache shared by all web processes.
+    """
+    key_salt = 'flite.users.verification.CacheVerificationBackend'
+
+    def entry_key(self, verification_id):
+        return f'phone-verify:{verification_id}'
+
+    def attempts_key(self, verification_id):
+        return f'phone-verify-attempts:{verification_id}'
+
+    def phone_key(self, phone_number):
+        return f'phone-verify-number:{phone_number}'
+
+    def hash_code(self, verification_id, code):
+        return salted_hmac(self.key_salt, f'{verification_id}:{code}').hexdigest()
+
+    def send(self, phone_number, email):
+        """
+        Issues a code for the phone number and returns (verification id, code).
+        A new code replaces any earlier one for the same number.
+        """
+        ttl = settings.PHONE_VERIFICATION_TTL_SECONDS
+        verification_id = uuid.uuid4().hex
+        code = utils.generate_new_user_passcode()
+        previous = cache.get(self.phone_key(phone_number))
+        if previous:
+            cache.delete_many([self.entry_key(previous), self.attempts_key(previous)])
+        cache.set_many({
+            self.entry_key(verification_id): {
+                'phone_number': str(phone_number),
+                'email': email,
+                'code': self.hash_code(verification_id, code),
+                'is_verified': False,
+            },
+            self.attempts_key(verification_id): 0,
+            self.phone_key(phone_number): verification_id,
+        }, ttl)
+        tasks.send_sms_verification_code(phone_number, code)
+        return verification_id, code
+
+    def verify(self, verification_id, code):
+        """
+        Checks a code against the verification it was issued for and returns
+        (status, message) as validate_mobile_signup_sms does.
+        """
+        entry_key = self.entry_key(verification_id)
+        entry = cache.get(entry_key)
+        if entry is None:
+            raise VerificationNotFound("Verification not found")
+        try:
+            # incr is atomic on shared backends, so concurrent guesses are
+            # all counted.
+            attempts = cache.incr(self.attempts_key(verification_id))
+        except ValueError:
+            raise VerificationNotFound("Verification not found")
+        if attempts > settings.PHONE_VERIFICATION_MAX_ATTEMPTS:
+            raise VerificationError("Too many attempts. Request a new code")
+        if not constant_time_compare(entry['code'], self.hash_code(verification_id, code)):
+            raise VerificationError("Verification code is incorrect")
+        if entry['is_verified']:
+            return 0, "Code has been verified"
+        entry['is_verified'] = True
+        cache.set(entry_key, entry, settings.PHONE_VERIFICATION_TTL_SECONDS)
+        return 1, "Code verified"
@@ -1,10 +1,11 @@
+from django.http import Http404
 from rest_framework import viewsets, mixins
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from .models import User, NewUserPhoneVerification
 from .permissions import IsUserOrReadOnly
 from .serializers import CreateUserSerializer, UserSerializer, SendNewPhonenumberSerializer
-from . import utils
+from . import throttling, verification
 
 class UserViewSet(mixins.RetrieveModelMixin,
                   mixins.UpdateModelMixin,
@@ -25,6 +26,7 @@ class UserCreateViewSet(mixins.CreateModelMixin,
     queryset = User.objects.all()
     serializer_class = CreateUserSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (throttling.SignupIPThrottle, throttling.SignupEmailThrottle)
 
 
 class SendNewPhonenumberVerifyViewSet(mixins.CreateModelMixin,mixins.UpdateModelMixin, viewsets.GenericViewSet):
@@ -34,19 +36,25 @@ class SendNewPhonenumberVerifyViewSet(mixins.CreateModelMixin,mixins.UpdateModel
     queryset = NewUserPhoneVerification.objects.all()
     serializer_class = SendNewPhonenumberSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (
+        throttling.PhoneVerificationIPThrottle,
+        throttling.PhoneVerificationNumberThrottle,
+        throttling.PhoneVerificationEmailThrottle,
+    )
 
 
     def update(self, request, pk=None,**kwargs):
-        verification_object = self.get_object()
         code = request.data.get("code")
 
         if code is None:
             return Response({"message":"Request not successful"}, 400)    
 
-        if verification_object.verification_code != code:
-            return Response({"message":"Verification code is incorrect"}, 400)    
-
-        code_status, msg = utils.validate_mobile_signup_sms(verification_object.phone_number, code)
+        try:
+            code_status, msg = verification.get_backend().verify(pk, str(code))
+        except verification.VerificationNotFound:
+            raise Http404
+        except verification.VerificationError as exc:
+            return Response({"message":str(exc)}, 400)    
         
         content = {
                 'verification_code_status': str(code_status),
@@ -0,0 +1,19 @@
+# Loaded with `gunicorn -c gunicorn.conf.py`. Prepares prometheus_client's
+# multiprocess mode, so /metrics reports every worker and not just the one
+# that served the scrape.
+import os
+import shutil
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/flite-prometheus')
+
+
+def on_starting(server):
+    # Samples left by a previous run would otherwise be reported as current.
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)